@@ -2,19 +2,40 @@
 Flask API server for VIC Leaderboard Local Scraper
 """
 
+import csv
 import json
+import os
 import threading
+import zlib
+from collections import OrderedDict
 from datetime import datetime
-from flask import Flask, request, jsonify
+from functools import wraps
+
+import click
+from dateutil import parser as date_parser
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 
-from db import get_db
+from db import AsyncDatabase, get_db
+from db.database import EXPORT_TABLES
 from scraper import LatestIdeasScraper, IdeaDetailScraper, AuthorHistoryScraper
-from services import YahooFinanceService, XIRRCalculator
+from services import YahooFinanceService, XIRRCalculator, ColumnarExporter
 
 app = Flask(__name__)
 CORS(app)  # Allow all origins for local development
 
+# Worker processes used for metrics calculation (1 = in-process)
+METRICS_WORKERS = int(os.environ.get('METRICS_WORKERS', 1))
+
+# Max distinct read responses (route + query params) kept in memory
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+
+# Serve leaderboard, search and author reads from async views over aiosqlite (1)
+# instead of plain views over sync sessions (0). Off by default: under a threaded
+# WSGI server each async view gets its own event loop, which costs more than it
+# saves (see benchmarks.load_test).
+ASYNC_READS = os.environ.get('ASYNC_READS', '0') == '1'
+
 # Global state for scraping progress
 scrape_state = {
     'is_running': False,
@@ -28,11 +49,85 @@ scrape_state = {
 }
 
 
+# ==================== Response Cache ====================
+
+class ResponseCache:
+    """
+    Bounded LRU of serialized read responses.
+
+    Entries are tagged with the database data_version they were built from,
+    so any committed write, by any process, invalidates them without having
+    to walk the cache.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return the cached body for key if it was built at this version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, body):
+        """Store a body, evicting the least recently used entries over the limit"""
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cached_response(view):
+    """
+    Serve a GET view from the response cache with ETag / If-None-Match support.
+
+    A matching If-None-Match gets a 304 without touching the database; a cache
+    hit skips the view entirely. Only 200 responses are cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version = get_db().data_version
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        etag = f'v{version}-{zlib.crc32(repr(key).encode()):08x}'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        body = response_cache.get(key, version)
+        if body is None:
+            response = app.make_response(app.ensure_sync(view)(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            response_cache.set(key, version, body)
+
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+
+    return wrapper
+
+
 # ==================== Health Check ====================
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (not cached, so its timestamp is live)"""
     db = get_db()
     stats = db.get_aggregate_stats()
     return jsonify({
@@ -175,6 +270,18 @@ def get_scrape_status():
     })
 
 
+@app.route('/api/scrape/history', methods=['GET'])
+def get_scrape_history():
+    """
+    Get daily scrape activity per job type
+
+    Query params:
+        days: Number of days to include, ending today (default 30)
+    """
+    days = int(request.args.get('days', 30))
+    return jsonify({'data': get_db().get_scrape_history(days=min(max(days, 1), 3650))})
+
+
 def start_scrape_thread():
     """Start the scraping process in a background thread"""
     thread = threading.Thread(target=run_scrape_process, daemon=True)
@@ -212,24 +319,19 @@ def run_scrape_process():
         scrape_state['total'] = len(ideas)
         scrape_state['progress'] = 0
 
-        authors_to_scrape = set()
-
-        for i, idea in enumerate(ideas):
-            scrape_state['current_item'] = idea.get('ticker')
-            scrape_state['progress'] = int((i / len(ideas)) * 100)
-
-            # Add idea to database (will skip if already exists)
-            db.add_idea(
-                author_username=idea['author'],
-                ticker=idea['ticker'],
-                posted_date=idea['posted_date'],
-                position_type=idea.get('position_type', 'long'),
-                company_name=idea.get('company_name'),
-                idea_url=idea.get('idea_url')
-            )
+        # Add ideas to database in one batch (existing ones are skipped)
+        db.add_ideas_bulk([{
+            'author_username': idea['author'],
+            'ticker': idea['ticker'],
+            'posted_date': idea['posted_date'],
+            'position_type': idea.get('position_type', 'long'),
+            'company_name': idea.get('company_name'),
+            'idea_url': idea.get('idea_url')
+        } for idea in ideas])
+        scrape_state['progress'] = 100
 
-            # Always scrape author's history to check for new ideas
-            authors_to_scrape.add(idea['author'])
+        # Always scrape author's history to check for new ideas
+        authors_to_scrape = {idea['author'] for idea in ideas}
 
         # Step 3: Scrape author histories for ALL authors from today's ideas
         scrape_state['current_step'] = 'scraping_authors'
@@ -243,17 +345,14 @@ def run_scrape_process():
 
                 author_ideas = scraper.scrape_author(username, years=5)
 
-                new_ideas_count = 0
-                for idea in author_ideas:
-                    result = db.add_idea(
-                        author_username=username,
-                        ticker=idea['ticker'],
-                        posted_date=idea['posted_date'],
-                        position_type=idea.get('position_type', 'long'),
-                        idea_url=idea.get('idea_url')
-                    )
-                    if not result.get('exists'):
-                        new_ideas_count += 1
+                results = db.add_ideas_bulk([{
+                    'author_username': username,
+                    'ticker': idea['ticker'],
+                    'posted_date': idea['posted_date'],
+                    'position_type': idea.get('position_type', 'long'),
+                    'idea_url': idea.get('idea_url')
+                } for idea in author_ideas])
+                new_ideas_count = sum(1 for r in results if not r['exists'])
 
                 db.update_author_scraped(username)
                 db.log_scrape('author', 'success', author_username=username,
@@ -267,7 +366,8 @@ def run_scrape_process():
         ideas_needing_prices = db.get_ideas_needing_prices(limit=100)
         scrape_state['total'] = len(ideas_needing_prices)
 
-        price_service = YahooFinanceService()
+        price_service = YahooFinanceService(db=db)
+        price_service.prefetch_history(ideas_needing_prices)
 
         for i, idea in enumerate(ideas_needing_prices):
             scrape_state['current_item'] = idea['ticker']
@@ -290,11 +390,14 @@ def run_scrape_process():
         scrape_state['progress'] = 0
 
         xirr_calc = XIRRCalculator()
-        metrics_result = xirr_calc.update_all_metrics(db)
+        metrics_result = xirr_calc.update_all_metrics(db, workers=METRICS_WORKERS)
         scrape_state['progress'] = 100
 
         db.log_scrape('metrics', 'success', items_processed=metrics_result['success'])
 
+        # Step 7: Fold old per-author log rows into daily summaries
+        db.compact_scrape_log()
+
         scrape_state['current_step'] = 'complete'
         scrape_state['completed_at'] = datetime.utcnow().isoformat()
 
@@ -308,7 +411,26 @@ def run_scrape_process():
 
 # ==================== Leaderboard ====================
 
+def _leaderboard_params():
+    """Database.get_leaderboard arguments from the request's query params"""
+    sort_by = request.args.get('sort', 'xirr_5yr')
+
+    # Map frontend field names to database fields
+    field_map = {
+        'xirr5yr': 'xirr_5yr',
+        'xirr3yr': 'xirr_3yr',
+        'xirr1yr': 'xirr_1yr'
+    }
+    return {
+        'sort_by': field_map.get(sort_by, sort_by),
+        'limit': int(request.args.get('limit', 25)),
+        'offset': int(request.args.get('offset', 0)),
+        'cursor': request.args.get('cursor')
+    }
+
+
 @app.route('/api/leaderboard', methods=['GET'])
+@cached_response
 def get_leaderboard():
     """
     Get leaderboard data with pagination.
@@ -317,29 +439,23 @@ def get_leaderboard():
         sort: Field to sort by (xirr_5yr, xirr_3yr, xirr_1yr)
         limit: Number of results (default 25)
         offset: Offset for pagination (default 0)
+        cursor: nextCursor from a previous page, for keyset pagination (overrides offset)
     """
-    sort_by = request.args.get('sort', 'xirr_5yr')
-    limit = int(request.args.get('limit', 25))
-    offset = int(request.args.get('offset', 0))
-
-    # Map frontend field names to database fields
-    field_map = {
-        'xirr5yr': 'xirr_5yr',
-        'xirr3yr': 'xirr_3yr',
-        'xirr1yr': 'xirr_1yr'
-    }
-    sort_by = field_map.get(sort_by, sort_by)
-
     db = get_db()
-    result = db.get_leaderboard(sort_by=sort_by, limit=limit, offset=offset)
+    try:
+        result = db.get_leaderboard(**_leaderboard_params())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     return jsonify(result)
 
 
 @app.route('/api/leaderboard/search', methods=['GET'])
+@cached_response
 def search_leaderboard():
     """
-    Search authors by username.
+    Search authors by username: prefix, substring and typo-tolerant matches,
+    ranked by match quality and then 5-year XIRR.
 
     Query params:
         q: Search term
@@ -360,6 +476,7 @@ def search_leaderboard():
 # ==================== Author Details ====================
 
 @app.route('/api/author/<username>', methods=['GET'])
+@cached_response
 def get_author(username):
     """Get author details with their ideas"""
     db = get_db()
@@ -371,6 +488,65 @@ def get_author(username):
     return jsonify(result)
 
 
+# ==================== Async Reads ====================
+
+_async_db = None
+
+
+def get_async_db():
+    """Get or create the async read path over the global database"""
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDatabase(get_db())
+    return _async_db
+
+
+@cached_response
+async def get_leaderboard_async():
+    """get_leaderboard, reading through AsyncDatabase"""
+    try:
+        result = await get_async_db().get_leaderboard(**_leaderboard_params())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result)
+
+
+@cached_response
+async def search_leaderboard_async():
+    """search_leaderboard, reading through AsyncDatabase"""
+    search_term = request.args.get('q', '')
+    limit = int(request.args.get('limit', 20))
+
+    if not search_term:
+        return jsonify({'data': []})
+
+    results = await get_async_db().search_authors(search_term, limit=limit)
+
+    return jsonify({'data': results})
+
+
+@cached_response
+async def get_author_async(username):
+    """get_author, reading through AsyncDatabase"""
+    result = await get_async_db().get_author_with_ideas(username)
+
+    if not result:
+        return jsonify({'error': 'Author not found'}), 404
+
+    return jsonify(result)
+
+
+# Only installed with ASYNC_READS=1, so the default sync path never goes
+# through Flask's per-request event loop
+if ASYNC_READS:
+    app.view_functions.update({
+        'get_leaderboard': get_leaderboard_async,
+        'search_leaderboard': search_leaderboard_async,
+        'get_author': get_author_async
+    })
+
+
 # ==================== Manual Operations ====================
 
 @app.route('/api/update/prices', methods=['POST'])
@@ -388,10 +564,16 @@ def update_prices():
 
 @app.route('/api/update/metrics', methods=['POST'])
 def update_metrics():
-    """Manually trigger metrics recalculation"""
+    """
+    Manually trigger metrics recalculation.
+
+    Body (optional): { full: boolean } - recalculate every author, not just changed ones
+    """
+    data = request.get_json(silent=True) or {}
+
     db = get_db()
     xirr_calc = XIRRCalculator()
-    result = xirr_calc.update_all_metrics(db)
+    result = xirr_calc.update_all_metrics(db, full=bool(data.get('full')), workers=METRICS_WORKERS)
 
     return jsonify({
         'success': True,
@@ -399,6 +581,59 @@ def update_metrics():
     })
 
 
+# ==================== Export ====================
+
+EXPORT_FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows', 'stream_ipc'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet', 'stream_parquet')
+}
+
+
+@app.route('/api/export', methods=['GET'])
+def export_table():
+    """
+    Stream a table as an Arrow IPC stream or a Parquet file, in bounded-memory chunks.
+
+    The X-Export-Watermark response header marks the last exported row; pass
+    it back as `since` to get only rows written after it.
+
+    Query params:
+        table: ideas, prices or author_metrics (default ideas)
+        format: arrow or parquet (default arrow)
+        since: Watermark from a previous export
+    """
+    table = request.args.get('table', 'ideas')
+    fmt = request.args.get('format', 'arrow')
+    since = request.args.get('since')
+
+    if table not in EXPORT_TABLES:
+        return jsonify({'error': f"table must be one of {', '.join(EXPORT_TABLES)}"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    db = get_db()
+    until = db.get_export_watermark(table)
+    mimetype, extension, stream_method = EXPORT_FORMATS[fmt]
+    stream = getattr(ColumnarExporter(db), stream_method)(table, since=since, until=until)
+
+    # Read the first chunk now, so a bad watermark is a 400 rather than a broken stream
+    try:
+        first = next(stream)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    headers = {'Content-Disposition': f'attachment; filename={table}.{extension}'}
+    watermark = until if until is not None else since
+    if watermark:
+        headers['X-Export-Watermark'] = watermark
+
+    def body():
+        yield first
+        yield from stream
+
+    return Response(body(), mimetype=mimetype, headers=headers)
+
+
 # ==================== Startup ====================
 
 def init_app():
@@ -408,6 +643,70 @@ def init_app():
     print("Database initialized")
 
 
+@app.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Recompute the counters behind /api/health and /api/scrape/status"""
+    drift = get_db().reconcile_counters()
+    if not drift:
+        print("Counters are in sync")
+    for name, change in drift.items():
+        print(f"{name}: {change['before']} -> {change['after']}")
+
+
+@app.cli.command('compact-scrape-log')
+@click.option('--raw-days', type=int, help='Days of individual log rows to keep')
+@click.option('--summary-days', type=int, help='Days of daily summaries to keep (0 = forever)')
+def compact_scrape_log_command(raw_days, summary_days):
+    """Fold old scrape log rows into daily summaries and apply retention"""
+    result = get_db().compact_scrape_log(raw_days=raw_days, summary_days=summary_days)
+    print(f"Compacted {result['compacted']} log rows into {result['summarized']} daily summaries, "
+          f"expired {result['expired']} summaries")
+
+
+@app.cli.command('export')
+@click.argument('out_dir', type=click.Path(file_okay=False))
+@click.option('--table', 'tables', multiple=True, type=click.Choice(EXPORT_TABLES),
+              help='Table to export (repeatable, default all)')
+@click.option('--full', is_flag=True, help='Ignore saved watermarks and export every row')
+def export_command(out_dir, tables, full):
+    """Export ideas, prices and metrics to Parquet, only rows new since the last export"""
+    exporter = ColumnarExporter(get_db())
+    results = exporter.export_incremental(out_dir, tables=tables or EXPORT_TABLES, full=full)
+    for table, result in results.items():
+        if result['path']:
+            print(f"{table}: {result['rows']} rows -> {result['path']}")
+        else:
+            print(f"{table}: no new rows")
+
+
+@app.cli.command('bulk-load')
+@click.option('--ideas', 'ideas_path', type=click.Path(exists=True, dir_okay=False),
+              help='CSV with author_username, ticker, posted_date and optional idea columns')
+@click.option('--prices', 'prices_path', type=click.Path(exists=True, dir_okay=False),
+              help='CSV with ticker and current_price columns')
+def bulk_load_command(ideas_path, prices_path):
+    """Load ideas and prices from CSV files (COPY on PostgreSQL)"""
+    db = get_db()
+
+    if ideas_path:
+        with open(ideas_path, newline='') as f:
+            ideas = ({
+                **{k: v or None for k, v in row.items()},
+                'posted_date': date_parser.parse(row['posted_date']),
+                'price_at_rec': float(row['price_at_rec']) if row.get('price_at_rec') else None
+            } for row in csv.DictReader(f))
+            loaded = db.load_ideas_bulk(ideas)
+        print(f"Ideas: {loaded['ideas']} new, {loaded['authors']} new authors")
+
+    if prices_path:
+        with open(prices_path, newline='') as f:
+            prices = {
+                row['ticker']: float(row['current_price']) if row['current_price'] else None
+                for row in csv.DictReader(f)
+            }
+        print(f"Prices: {db.load_prices_bulk(prices)} of {len(prices)} tickers changed")
+
+
 if __name__ == '__main__':
     init_app()
     print("Starting VIC Leaderboard API server...")
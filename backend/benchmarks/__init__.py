@@ -0,0 +1 @@
+"""Benchmarks for VIC Leaderboard backend hot paths"""
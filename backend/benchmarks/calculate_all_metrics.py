@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: single-pass calculate_all_metrics vs the old multi-pass approach
+
+Usage (from backend/):
+    python -m benchmarks.calculate_all_metrics
+"""
+
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from services.xirr_calculator import XIRRCalculator
+
+IDEA_COUNTS = [50, 200, 500, 1000]
+
+
+def make_ideas(n, seed=42):
+    """Build n synthetic ideas over the past 6 years, newest first like the DB returns them"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    tickers = [f'T{i}' for i in range(max(n // 2, 1))]
+    prices = {t: rng.uniform(5, 200) for t in tickers}
+
+    ideas = []
+    for _ in range(n):
+        ticker = rng.choice(tickers)
+        posted = now - timedelta(days=rng.randint(0, 6 * 365))
+        ideas.append({
+            'ticker': ticker,
+            'posted_date': posted.replace(hour=0, minute=0, second=0, microsecond=0).isoformat(),
+            'price_at_rec': prices[ticker] * rng.lognormvariate(0, 0.5),
+            'position_type': 'short' if rng.random() < 0.15 else 'long'
+        })
+
+    ideas.sort(key=lambda i: i['posted_date'], reverse=True)
+    return ideas, prices
+
+
+def multi_pass_metrics(calc, ideas, prices):
+    """The previous implementation: three windowed passes plus a stats pass"""
+    result = {
+        'xirr_5yr': calc.calculate_for_ideas(ideas, prices, window_years=5),
+        'xirr_3yr': calc.calculate_for_ideas(ideas, prices, window_years=3),
+        'xirr_1yr': calc.calculate_for_ideas(ideas, prices, window_years=1)
+    }
+
+    cutoff = datetime.now() - timedelta(days=5 * 365)
+    returns = []
+    for idea in ideas:
+        posted_date = datetime.fromisoformat(idea['posted_date'])
+        current_price = prices.get(idea['ticker'])
+        price_at_rec = idea['price_at_rec']
+        if posted_date >= cutoff and price_at_rec and price_at_rec > 0 and current_price:
+            if idea['position_type'] == 'long':
+                returns.append((idea['ticker'], (current_price - price_at_rec) / price_at_rec * 100))
+            else:
+                returns.append((idea['ticker'], (price_at_rec - current_price) / price_at_rec * 100))
+
+    result['total_picks'] = len(returns)
+    if returns:
+        result['win_rate'] = round(sum(1 for r in returns if r[1] > 0) / len(returns) * 100, 1)
+        best = max(returns, key=lambda r: r[1])
+        result['best_pick_ticker'] = best[0]
+        result['best_pick_return'] = round(best[1], 1)
+    return result
+
+
+def main():
+    calc = XIRRCalculator()
+
+    print(f"{'ideas':>6} {'multi-pass (ms)':>16} {'single-pass (ms)':>17} {'speedup':>8}")
+    for n in IDEA_COUNTS:
+        ideas, prices = make_ideas(n)
+        runs = max(2000 // n, 5)
+
+        old = min(timeit.repeat(lambda: multi_pass_metrics(calc, ideas, prices), number=runs, repeat=3))
+        new = min(timeit.repeat(lambda: calc.calculate_all_metrics(ideas, prices), number=runs, repeat=3))
+
+        old_ms = old / runs * 1000
+        new_ms = new / runs * 1000
+        print(f"{n:>6} {old_ms:>16.3f} {new_ms:>17.3f} {old_ms / new_ms:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Concurrency benchmark: leaderboard read latency while a bulk ingest runs
+
+Compares SQLite's default rollback journal with the WAL storage profile in
+db.database.SQLITE_PRAGMAS. For each mode a synthetic database is built,
+metrics are calculated, and then a writer thread ingests batches of ideas
+through Database.add_ideas_bulk while reader threads poll get_leaderboard.
+
+Usage (from backend/):
+    python -m benchmarks.concurrency --authors 2000 --ideas 100000 --seconds 10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from db import Database
+from services import XIRRCalculator
+
+from .synthetic import populate
+
+MODES = {
+    'rollback_journal': {'journal_mode': 'DELETE', 'busy_timeout': 5000},
+    'wal_profile': None  # Database default (SQLITE_PRAGMAS)
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def _writer(db, stop, batch_size, stats):
+    """Ingest batches of new ideas until told to stop"""
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    batch = 0
+    while not stop.is_set():
+        ideas = [{
+            'author_username': f'ingest{rng.randint(0, 500)}',
+            'ticker': f'NEW{rng.randint(0, 999)}',
+            'posted_date': now - timedelta(days=rng.randint(0, 1800)),
+            'price_at_rec': rng.uniform(5, 100),
+            'idea_url': f'https://valueinvestorsclub.com/idea/bench/{batch}-{i}'
+        } for i in range(batch_size)]
+        start = time.perf_counter()
+        db.add_ideas_bulk(ideas)
+        stats['write_ms'].append((time.perf_counter() - start) * 1000)
+        batch += 1
+
+
+def _reader(db, stop, stats):
+    """Poll leaderboard pages until told to stop"""
+    rng = random.Random(threading.get_ident())
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            db.get_leaderboard('xirr_5yr', limit=25, offset=rng.randint(0, 500))
+            stats['read_ms'].append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            stats['errors'].append(str(e))
+
+
+def run_mode(name, pragmas, args, workdir):
+    db = Database(os.path.join(workdir, f'{name}.db'), pragmas=pragmas)
+    db.init_db()
+    populate(db, authors=args.authors, ideas=args.ideas, tickers=args.tickers, seed=args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        XIRRCalculator().update_all_metrics(db, full=True)
+
+    stats = {'read_ms': [], 'write_ms': [], 'errors': []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=_writer, args=(db, stop, args.batch_size, stats))]
+    threads += [threading.Thread(target=_reader, args=(db, stop, stats)) for _ in range(args.readers)]
+
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    db.engine.dispose()
+
+    reads = stats['read_ms'] or [0]
+    result = {
+        'reads': len(stats['read_ms']),
+        'read_errors': len(stats['errors']),
+        'read_p50_ms': round(_percentile(reads, 50), 3),
+        'read_p95_ms': round(_percentile(reads, 95), 3),
+        'read_p99_ms': round(_percentile(reads, 99), 3),
+        'read_max_ms': round(max(reads), 3),
+        'write_batches': len(stats['write_ms']),
+        'write_median_ms': round(statistics.median(stats['write_ms']), 3) if stats['write_ms'] else None
+    }
+    print(f"  {name:<18} reads {result['reads']:>7}  p50 {result['read_p50_ms']:>8.2f}  "
+          f"p95 {result['read_p95_ms']:>8.2f}  p99 {result['read_p99_ms']:>8.2f} ms  "
+          f"errors {result['read_errors']}  write batches {result['write_batches']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Leaderboard read latency under bulk ingest')
+    parser.add_argument('--authors', type=int, default=2000)
+    parser.add_argument('--ideas', type=int, default=100000)
+    parser.add_argument('--tickers', type=int, default=4000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='vic-bench-') as workdir:
+        print(f"{args.readers} readers vs 1 bulk writer for {args.seconds}s per mode")
+        for name, pragmas in MODES.items():
+            results[name] = run_mode(name, pragmas, args, workdir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
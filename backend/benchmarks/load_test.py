@@ -0,0 +1,179 @@
+"""
+HTTP load test: sync vs async read path for the API
+
+Builds one synthetic database, then for each mode (ASYNC_READS=0 / 1) starts
+the Flask app in a subprocess on a threaded WSGI server and drives it with
+concurrent clients requesting author pages, leaderboard pages and searches.
+The response cache is disabled so every request reaches the read path.
+With --writer, the server process also ingests idea batches the whole time,
+like a running scrape.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --clients 32 --seconds 10
+    python -m benchmarks.load_test --writer --output load.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from db import Database
+from services import XIRRCalculator
+
+from .concurrency import _percentile, _writer
+from .synthetic import populate
+
+MODES = {'sync': '0', 'async': '1'}
+
+# Share of requests per route
+MIX = (('author', 0.5), ('leaderboard', 0.3), ('search', 0.2))
+
+
+def serve(db_path, port, writer, batch_size):
+    """Run the API on a threaded WSGI server (subprocess entry point)"""
+    from werkzeug.serving import make_server
+    import db.database as database
+
+    database._db = Database(db_path)
+    database._db.init_db()
+
+    import app as api
+
+    if writer:
+        stop = threading.Event()
+        stats = {'write_ms': []}
+        threading.Thread(target=_writer, args=(database._db, stop, batch_size, stats),
+                         daemon=True).start()
+
+    make_server('127.0.0.1', port, api.app, threaded=True).serve_forever()
+
+
+def _wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/health', timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError('API server did not start')
+
+
+def _client(base_url, usernames, prefixes, stop, stats, seed):
+    """Issue requests from the route mix until told to stop"""
+    rng = random.Random(seed)
+    routes, weights = zip(*MIX)
+    while not stop.is_set():
+        route = rng.choices(routes, weights)[0]
+        if route == 'author':
+            path = f'/api/author/{urllib.parse.quote(rng.choice(usernames))}'
+        elif route == 'leaderboard':
+            path = f'/api/leaderboard?limit=25&offset={rng.randint(0, 500)}'
+        else:
+            path = f'/api/leaderboard/search?q={urllib.parse.quote(rng.choice(prefixes))}'
+
+        start = time.perf_counter()
+        try:
+            urllib.request.urlopen(base_url + path, timeout=30).read()
+            stats['latency_ms'].append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            stats['errors'].append(str(e))
+
+
+def run_mode(name, flag, db_path, usernames, args):
+    port = args.port
+    base_url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, ASYNC_READS=flag, RESPONSE_CACHE_SIZE='0')
+    cmd = [sys.executable, '-m', 'benchmarks.load_test', '--serve', db_path,
+           '--port', str(port), '--batch-size', str(args.batch_size)]
+    if args.writer:
+        cmd.append('--writer')
+    server = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        _wait_until_up(base_url)
+        prefixes = sorted({u[:3] for u in usernames})
+        stats = {'latency_ms': [], 'errors': []}
+        stop = threading.Event()
+        clients = [
+            threading.Thread(target=_client, args=(base_url, usernames, prefixes, stop, stats, i))
+            for i in range(args.clients)
+        ]
+        for c in clients:
+            c.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for c in clients:
+            c.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = stats['latency_ms'] or [0]
+    result = {
+        'requests': len(stats['latency_ms']),
+        'errors': len(stats['errors']),
+        'rps': round(len(stats['latency_ms']) / args.seconds, 1),
+        'p50_ms': round(_percentile(latencies, 50), 3),
+        'p95_ms': round(_percentile(latencies, 95), 3),
+        'p99_ms': round(_percentile(latencies, 99), 3)
+    }
+    print(f"  {name:<6} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f}  "
+          f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync vs async API read throughput')
+    parser.add_argument('--authors', type=int, default=2000)
+    parser.add_argument('--ideas', type=int, default=100000)
+    parser.add_argument('--tickers', type=int, default=4000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--writer', action='store_true', help='Ingest ideas while serving')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--serve', metavar='DB_PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.writer, args.batch_size)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='vic-bench-') as workdir:
+        db_path = os.path.join(workdir, 'load.db')
+        db = Database(db_path)
+        db.init_db()
+        populate(db, authors=args.authors, ideas=args.ideas, tickers=args.tickers, seed=args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            XIRRCalculator().update_all_metrics(db, full=True)
+        usernames = [a['username'] for a in db.get_all_authors()]
+        db.engine.dispose()
+
+        print(f"{args.clients} clients for {args.seconds}s per mode"
+              f"{' with a bulk writer' if args.writer else ''}")
+        for name, flag in MODES.items():
+            results[name] = run_mode(name, flag, db_path, usernames, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
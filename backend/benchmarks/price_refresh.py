@@ -0,0 +1,103 @@
+"""
+Price refresh benchmark: per-symbol vs batched current-price requests
+
+Builds one synthetic database whose prices are all stale, then for each
+batch size runs YahooFinanceService.update_all_prices on a fresh copy of it
+against a FixturePriceProvider that answers every request after a fixed
+latency, standing in for Yahoo. Some symbols are missing from the fixture,
+so the per-ticker failure path is exercised too.
+
+Usage (from backend/):
+    python -m benchmarks.price_refresh --tickers 400 --latency 0.1
+    python -m benchmarks.price_refresh --batch-sizes 1,50,200 --output refresh.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from db import Database
+from services import YahooFinanceService
+from services.price_providers import FixturePriceProvider
+
+from .synthetic import populate
+
+
+def run_batch_size(batch_size, db_path, workdir, fixture, args):
+    """Refresh every stale price with one batch size on a copy of the database"""
+    path = os.path.join(workdir, f'refresh-{batch_size}.db')
+    shutil.copy(db_path, path)
+    db = Database(path)
+
+    provider = FixturePriceProvider(fixture, latency=args.latency, failures=args.failures)
+    service = YahooFinanceService(rate_limit_delay=args.delay, batch_size=batch_size,
+                                  price_provider=provider)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = service.update_all_prices(db, max_age_hours=0)
+    elapsed = time.perf_counter() - start
+    db.engine.dispose()
+
+    result = {
+        'requests': len(provider.requests),
+        'seconds': round(elapsed, 3),
+        **counts
+    }
+    print(f"  batch {batch_size:>5}  {result['requests']:>6} requests  {result['seconds']:>8.2f} s  "
+          f"updated {result['updated']}  failed {result['failed']}  skipped {result['skipped']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-symbol vs batched price refresh')
+    parser.add_argument('--authors', type=int, default=500)
+    parser.add_argument('--ideas', type=int, default=20000)
+    parser.add_argument('--tickers', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-sizes', default='1,50,200',
+                        help='Comma-separated symbols per request to compare')
+    parser.add_argument('--latency', type=float, default=0.1, help='Seconds per request')
+    parser.add_argument('--delay', type=float, default=0.0, help='rate_limit_delay between requests')
+    parser.add_argument('--missing', type=float, default=0.02,
+                        help='Fraction of symbols the fixture has no price for')
+    parser.add_argument('--failures', type=int, default=0,
+                        help='Initial requests that fail as a whole (exercises retries)')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    batch_sizes = [int(b) for b in args.batch_sizes.split(',')]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='vic-bench-') as workdir:
+        db_path = os.path.join(workdir, 'prices.db')
+        db = Database(db_path)
+        db.init_db()
+        populate(db, authors=args.authors, ideas=args.ideas, tickers=args.tickers,
+                 seed=args.seed, stale_fraction=1.0)
+
+        rng = random.Random(args.seed)
+        yahoo_symbols = db.get_yahoo_symbols(db.get_tickers_needing_update(0))
+        fixture = {
+            symbol: round(rng.lognormvariate(3, 1), 2)
+            for symbol in yahoo_symbols.values() if symbol and rng.random() >= args.missing
+        }
+        db.engine.dispose()
+
+        print(f"{len(yahoo_symbols)} stale tickers, {args.latency}s per request")
+        for batch_size in batch_sizes:
+            results[batch_size] = run_batch_size(batch_size, db_path, workdir, fixture, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Query plan check: no full table scans on the hot read paths
+
+Builds a synthetic database (1M ideas by default), calls each hot Database
+method while capturing the SQL it issues, and runs EXPLAIN QUERY PLAN on every
+captured statement. A plan step that scans a table without an index fails the
+check (exit status 1), as does a check that issued no SQL at all.
+
+Usage (from backend/):
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --authors 2000 --ideas 100000 --keep-db
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+from sqlalchemy import event
+
+from db import Database
+from services import XIRRCalculator
+
+from .synthetic import populate
+
+
+def _capture_statements(db, fn):
+    """Run fn and return the (sql, parameters) of every SELECT it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def _full_scans(plan_rows):
+    """Plan steps that walk a whole table rather than an index"""
+    return [
+        detail for _, _, _, detail in plan_rows
+        if detail.startswith('SCAN ') and 'INDEX' not in detail
+        and not detail.startswith('SCAN CONSTANT ROW')
+    ]
+
+
+def check_plans(db, dataset):
+    """
+    EXPLAIN every statement issued by the hot read paths.
+
+    Returns:
+        Dict mapping check name to list of {'sql', 'plan', 'full_scans'} dicts
+    """
+    username = dataset['sample_username']
+    author_ids = [a['id'] for a in db.get_all_authors()[:50]]
+    # Leaderboard pages normally come from the snapshot; check the SQL fallback
+    cursor = db.get_leaderboard('xirr_5yr', limit=25, use_snapshot=False)['nextCursor']
+    _, _, watermark = db.export_rows('ideas', limit=1000)
+
+    checks = [
+        ('get_tickers_needing_update', lambda: db.get_tickers_needing_update(24)),
+        ('get_ideas_needing_prices', lambda: db.get_ideas_needing_prices(100)),
+        ('get_ideas_for_author', lambda: db.get_ideas_for_author(username)),
+        ('get_ideas_for_authors', lambda: db.get_ideas_for_authors(author_ids)),
+        ('get_author_with_ideas', lambda: db.get_author_with_ideas(username)),
+        ('get_leaderboard', lambda: db.get_leaderboard('xirr_5yr', limit=25, offset=100,
+                                                       use_snapshot=False)),
+        ('get_leaderboard_cursor', lambda: db.get_leaderboard('xirr_5yr', limit=25, cursor=cursor,
+                                                              use_snapshot=False)),
+        ('get_scrape_status', db.get_scrape_status),
+        ('get_scrape_history', lambda: db.get_scrape_history(days=30)),
+        ('export_rows', lambda: db.export_rows('ideas', after=watermark, limit=1000)),
+    ]
+
+    results = {}
+    with db.engine.connect() as conn:
+        raw = conn.connection.dbapi_connection
+        for name, fn in checks:
+            results[name] = []
+            for sql, params in _capture_statements(db, fn):
+                plan = raw.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+                results[name].append({
+                    'sql': ' '.join(sql.split()),
+                    'plan': [row[3] for row in plan],
+                    'full_scans': _full_scans(plan)
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN checks for hot queries')
+    parser.add_argument('--authors', type=int, default=20000)
+    parser.add_argument('--ideas', type=int, default=1000000)
+    parser.add_argument('--tickers', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep-db', action='store_true', help='Keep the generated database')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='vic-plans-'), 'plans.db')
+    db = Database(db_path)
+    db.init_db()
+
+    print(f"Populating {args.authors} authors / {args.ideas} ideas...")
+    dataset = populate(db, authors=args.authors, ideas=args.ideas,
+                       tickers=args.tickers, seed=args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        XIRRCalculator().update_all_metrics(db, full=True)
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+    failures = 0
+    for name, statements in check_plans(db, dataset).items():
+        print(f"\n{name}")
+        if not statements:
+            # Nothing was checked, e.g. the call was answered from a cache
+            print("  [NO SQL] no statements captured")
+            failures += 1
+        for stmt in statements:
+            status = 'FULL SCAN' if stmt['full_scans'] else 'ok'
+            print(f"  [{status}] {stmt['sql'][:110]}")
+            for step in stmt['plan']:
+                print(f"      {step}")
+            failures += bool(stmt['full_scans'])
+
+    db.engine.dispose()
+    if args.keep_db:
+        print(f"\nDatabase kept at {db_path}")
+    else:
+        shutil.rmtree(os.path.dirname(db_path))
+
+    print(f"\n{failures} statement(s) with full table scans or checks without SQL")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
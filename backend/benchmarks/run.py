@@ -0,0 +1,175 @@
+"""
+Benchmark suite for metrics, database and API hot paths
+
+Builds a throwaway SQLite database filled with seeded synthetic data, times
+the hot paths and writes the results as JSON so runs can be compared between
+commits.
+
+Usage (from backend/):
+    python -m benchmarks.run --authors 1000 --ideas 50000 --output bench.json
+    python -m benchmarks.run --authors 10000 --ideas 1000000 --tickers 20000
+    python -m benchmarks.run --compare bench.json   # show ratios against a previous run
+    python -m benchmarks.run --database-url postgresql+psycopg2://vic@localhost/vic_bench
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from db import Base, Database
+from services import XIRRCalculator
+
+from .synthetic import populate
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_call(fn, repeat=5):
+    """Run fn `repeat` times and return timing stats in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Keep progress prints from the code under test out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'max_ms': round(max(timings), 3)
+    }
+
+
+def _repriced(db):
+    """Every stored price moved by 1%, so each call changes every ticker"""
+    return {ticker: price * 1.01 for ticker, price in db.get_all_prices().items()}
+
+
+def run_suite(db, dataset, repeat=5):
+    """Time every benchmark against a populated database"""
+    calc = XIRRCalculator()
+    username = dataset['sample_username']
+    prefix = dataset['sample_prefix']
+    deep_offset = max(dataset['authors'] // 2, 0)
+    typo = username[:2] + username[3:]  # one dropped character
+
+    benchmarks = [
+        # The first full run also fills author_metrics for the read benchmarks
+        ('metrics.update_all_full', lambda: calc.update_all_metrics(db, full=True), 1),
+        ('metrics.update_all_incremental_noop', lambda: calc.update_all_metrics(db), repeat),
+        ('db.get_leaderboard_first_page', lambda: db.get_leaderboard('xirr_5yr', limit=25, offset=0), repeat),
+        ('db.get_leaderboard_deep_page', lambda: db.get_leaderboard('xirr_5yr', limit=25, offset=deep_offset), repeat),
+        ('db.get_leaderboard_1yr', lambda: db.get_leaderboard('xirr_1yr', limit=25, offset=0), repeat),
+        ('db.search_authors', lambda: db.search_authors(prefix, limit=20), repeat),
+        ('db.search_authors_fuzzy', lambda: db.search_authors(typo, limit=20), repeat),
+        ('db.get_author_with_ideas', lambda: db.get_author_with_ideas(username), repeat),
+        ('db.get_tickers_needing_update', lambda: db.get_tickers_needing_update(24), repeat),
+        # Writes last so the read benchmarks above see the generated prices
+        ('db.update_prices_bulk', lambda: db.update_prices_bulk(_repriced(db)), repeat),
+        ('db.load_prices_bulk', lambda: db.load_prices_bulk(_repriced(db)), repeat),
+    ]
+
+    results = {}
+    for name, fn, runs in benchmarks:
+        results[name] = time_call(fn, runs)
+        print(f"  {name:<40} median {results[name]['median_ms']:>10.2f} ms")
+
+    return results
+
+
+def compare(current, baseline):
+    """Print median ratios (current / baseline) for benchmarks present in both runs"""
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, stats in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old or not old['median_ms']:
+            continue
+        ratio = stats['median_ms'] / old['median_ms']
+        print(f"  {name:<40} {old['median_ms']:>10.2f} -> {stats['median_ms']:>10.2f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backend hot path benchmarks')
+    parser.add_argument('--authors', type=int, default=1000)
+    parser.add_argument('--ideas', type=int, default=50000)
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per read benchmark')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Previous JSON results to compare against')
+    parser.add_argument('--keep-db', action='store_true', help='Keep the generated database')
+    parser.add_argument('--database-url',
+                        help='Empty, throwaway database to run against instead of a '
+                             'temporary SQLite file (its tables are dropped afterwards)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='vic-bench-')
+    db_path = os.path.join(workdir, 'bench.db')
+
+    print(f"Generating {args.authors} authors / {args.ideas} ideas / {args.tickers} tickers...")
+    if args.database_url:
+        db = Database(url=args.database_url, snapshot_path=f'{db_path}.leaderboard')
+        db_path = db.engine.url.render_as_string(hide_password=True)
+    else:
+        db = Database(db_path)
+    db.init_db()
+
+    start = time.perf_counter()
+    dataset = populate(db, authors=args.authors, ideas=args.ideas,
+                       tickers=args.tickers, seed=args.seed)
+    populate_s = time.perf_counter() - start
+    print(f"  populated in {populate_s:.1f}s ({db_path})")
+
+    print("Running benchmarks...")
+    results = run_suite(db, dataset, repeat=args.repeat)
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'backend': db.dialect,
+            'platform': platform.platform(),
+            'dataset': dataset,
+            'populate_s': round(populate_s, 2)
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    if args.database_url and not args.keep_db:
+        Base.metadata.drop_all(db.engine)
+    db.engine.dispose()
+    if not args.keep_db:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
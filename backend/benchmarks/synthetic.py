@@ -0,0 +1,153 @@
+"""
+Seeded synthetic data generator for benchmarks
+
+Populates a Database with authors, ideas and prices that look roughly like
+VIC data: a skewed number of ideas per author, tickers shared across authors,
+some ideas without a usable price_at_rec and some tickers without a price.
+"""
+
+import random
+import string
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from db import Author, Idea, Price, Ticker
+from db.ticker_symbols import normalize_ticker
+
+INSERT_CHUNK = 10000
+
+
+def _usernames(rng, n):
+    """Unique lowercase-ish usernames like 'valuehunter42'"""
+    words = ['value', 'deep', 'contrarian', 'special', 'sits', 'micro', 'cap', 'moat',
+             'compounder', 'activist', 'event', 'distressed', 'yield', 'quality', 'graham']
+    names = set()
+    while len(names) < n:
+        name = rng.choice(words) + rng.choice(words).capitalize() + str(rng.randint(1, 9999))
+        names.add(name)
+    return sorted(names)
+
+
+def _tickers(rng, n):
+    """Unique 1-5 letter ticker symbols"""
+    symbols = set()
+    while len(symbols) < n:
+        length = rng.choice([2, 3, 3, 4, 4, 4, 5])
+        symbols.add(''.join(rng.choice(string.ascii_uppercase) for _ in range(length)))
+    return sorted(symbols)
+
+
+def _insert_chunks(session, model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        session.execute(insert(model), rows[start:start + INSERT_CHUNK])
+
+
+def populate(db, authors=1000, ideas=50000, tickers=2000, seed=42,
+             price_coverage=0.85, stale_fraction=0.2):
+    """
+    Fill an empty database with synthetic data.
+
+    Args:
+        db: Database instance (tables must already exist)
+        authors: Number of authors
+        ideas: Total number of ideas, spread unevenly across authors
+        tickers: Number of distinct tickers
+        seed: Random seed, so the same arguments always give the same data
+        price_coverage: Fraction of tickers with a current price
+        stale_fraction: Fraction of prices older than 24 hours
+
+    Returns:
+        Dict with the generated counts and a few sample keys for lookups
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    usernames = _usernames(rng, authors)
+    symbols = _tickers(rng, tickers)
+    base_prices = {t: rng.lognormvariate(3, 1) for t in symbols}
+
+    # Skewed ideas per author: a few prolific authors, a long tail of occasional ones
+    weights = [rng.paretovariate(1.2) for _ in range(authors)]
+    author_ids = rng.choices(range(1, authors + 1), weights=weights, k=ideas)
+
+    author_rows = [{
+        'username': name,
+        'username_lower': name.lower(),
+        'discovered_at': now - timedelta(days=rng.randint(0, 365)),
+    } for i, name in enumerate(usernames)]
+
+    idea_rows = []
+    for i, author_id in enumerate(author_ids):
+        ticker = rng.choice(symbols)
+        posted = now - timedelta(days=rng.randint(0, 7 * 365))
+        posted = posted.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        roll = rng.random()
+        if roll < 0.05:
+            price_at_rec = None
+        elif roll < 0.10:
+            price_at_rec = -1.0
+        else:
+            price_at_rec = base_prices[ticker] * rng.lognormvariate(0, 0.5)
+
+        idea_rows.append({
+            'author_id': author_id,  # Generated position, mapped to the row id below
+            'vic_idea_id': str(100000 + i),
+            'ticker_id': ticker,  # Symbol, mapped to the row id below
+            'company_name': f'{ticker} Holdings',
+            'posted_date': posted,
+            'position_type': 'short' if rng.random() < 0.15 else 'long',
+            'price_at_rec': price_at_rec,
+            'idea_url': f'https://valueinvestorsclub.com/idea/{ticker}/{100000 + i}',
+            'scraped_at': now,
+            'updated_at': now
+        })
+
+    price_rows = []
+    for ticker in symbols:
+        if rng.random() >= price_coverage:
+            continue
+        updated = now - timedelta(hours=48 if rng.random() < stale_fraction else 1)
+        price_rows.append({
+            'ticker_id': ticker,
+            'current_price': base_prices[ticker],
+            'last_updated': updated,
+            'price_changed_at': updated,
+            'fetch_failed': False
+        })
+
+    ticker_rows = [{'symbol': t, **normalize_ticker(t)} for t in symbols]
+
+    with db.session_scope() as session:
+        # Let the database assign author and ticker ids (explicit ids would
+        # leave PostgreSQL sequences behind), then point ideas and prices at them
+        _insert_chunks(session, Author, author_rows)
+        _insert_chunks(session, Ticker, ticker_rows)
+        row_ids = dict(session.query(Author.username, Author.id))
+        ticker_ids = dict(session.query(Ticker.symbol, Ticker.id))
+        for row in idea_rows:
+            row['author_id'] = row_ids[usernames[row['author_id'] - 1]]
+            row['ticker_id'] = ticker_ids[row['ticker_id']]
+        for row in price_rows:
+            row['ticker_id'] = ticker_ids[row['ticker_id']]
+        _insert_chunks(session, Idea, idea_rows)
+        _insert_chunks(session, Price, price_rows)
+
+    # Core inserts bypass the write paths, so derive persisted returns and
+    # counters in one pass each
+    db.refresh_idea_returns()
+    db.reconcile_counters()
+
+    # The most prolific author is the worst case for author detail lookups
+    busiest = max(range(1, authors + 1), key=lambda a: weights[a - 1])
+
+    return {
+        'authors': authors,
+        'ideas': ideas,
+        'tickers': tickers,
+        'prices': len(price_rows),
+        'seed': seed,
+        'sample_username': usernames[busiest - 1],
+        'sample_prefix': usernames[busiest - 1][:4]
+    }
@@ -1,9 +1,14 @@
 """Database package"""
 
-from .models import Base, Author, Idea, Price, AuthorMetrics, ScrapeLog, CookieStore
+from .models import (
+    Base, Author, Ticker, DailyClose, Idea, Price, AuthorMetrics, Counters, ScrapeLog,
+    ScrapeLogDaily, CookieStore
+)
 from .database import Database, get_db
+from .async_database import AsyncDatabase
 
 __all__ = [
-    'Base', 'Author', 'Idea', 'Price', 'AuthorMetrics', 'ScrapeLog', 'CookieStore',
-    'Database', 'get_db'
+    'Base', 'Author', 'Ticker', 'DailyClose', 'Idea', 'Price', 'AuthorMetrics', 'Counters',
+    'ScrapeLog', 'ScrapeLogDaily', 'CookieStore',
+    'Database', 'get_db', 'AsyncDatabase'
 ]
@@ -0,0 +1,101 @@
+"""
+Async read path for the API, using SQLAlchemy asyncio with aiosqlite (or asyncpg)
+"""
+
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from .models import AuthorMetrics
+
+# Async driver per Database backend (asyncpg must be installed for PostgreSQL)
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+
+class AsyncDatabase:
+    """
+    Async counterparts of the Database read methods used by the API.
+
+    Shares the leaderboard snapshot, search index and caches of the wrapped
+    Database, and reuses its query code through AsyncSession.run_sync, so
+    both paths always return the same data. Only the I/O differs: queries go
+    through an async driver, so awaiting a read doesn't hold the event loop
+    while the database waits on a writer.
+    """
+
+    def __init__(self, db):
+        """
+        Args:
+            db: Database whose file, pragmas and in-memory state to share
+        """
+        self.db = db
+        url = db.engine.url.set(drivername=ASYNC_DRIVERS[db.dialect])
+        # Flask runs each async view in its own event loop, and async driver
+        # connections belong to the loop that opened them, so don't pool
+        if db.dialect == 'sqlite':
+            self.engine = create_async_engine(
+                url,
+                poolclass=NullPool,
+                connect_args={'timeout': db.pragmas.get('busy_timeout', 5000) / 1000}
+            )
+            event.listen(self.engine.sync_engine, 'connect', db._apply_pragmas)
+        else:
+            self.engine = create_async_engine(url, poolclass=NullPool)
+        self.Session = async_sessionmaker(self.engine, class_=AsyncSession,
+                                          expire_on_commit=False)
+        self._first_connect_lock = threading.Lock()
+        self._connected = False
+
+    async def _ensure_connected(self):
+        """
+        Open the engine's first connection exactly once.
+
+        SQLAlchemy serialises dialect initialisation on first connect with an
+        asyncio lock, which is bound to whichever event loop takes it; two
+        views connecting first from different loops would trip over it.
+        After one successful connect the lock is never used again.
+        """
+        if self._connected:
+            return
+        # Blocks only the threads of other loops, and only until the first connect
+        with self._first_connect_lock:
+            if not self._connected:
+                async with self.engine.connect():
+                    pass
+                self._connected = True
+
+    async def _run(self, fn, *args):
+        """Run a Database query helper fn(session, *args) on an async session"""
+        await self._ensure_connected()
+        async with self.Session() as session:
+            return await session.run_sync(fn, *args)
+
+    async def get_leaderboard(self, sort_by='xirr_5yr', limit=50, offset=0, cursor=None,
+                              use_snapshot=True):
+        """Async Database.get_leaderboard (the snapshot path needs no I/O wait)"""
+        sort_field = getattr(AuthorMetrics, sort_by, AuthorMetrics.xirr_5yr)
+
+        if use_snapshot:
+            result = self.db._leaderboard_from_snapshot(sort_field, limit, offset, cursor)
+            if result is not None:
+                return result
+
+        return await self._run(self.db._query_leaderboard, sort_field, limit, offset, cursor)
+
+    async def search_authors(self, search_term, limit=20):
+        """Async Database.search_authors (only a stale index needs more than one lookup)"""
+        version = await self._run(self.db._metrics_version)
+        index = self.db._current_search_index(version)
+        if index is None:
+            rows = await self._run(self.db._query_search_rows)
+            index = self.db._set_search_index(version, rows)
+        return index.search(search_term, limit=limit)
+
+    async def get_author_with_ideas(self, username):
+        """Async Database.get_author_with_ideas"""
+        return await self._run(self.db._query_author_with_ideas, username)
+
+    async def dispose(self):
+        await self.engine.dispose()
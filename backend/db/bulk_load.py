@@ -0,0 +1,115 @@
+"""
+Staging tables and COPY for bulk loads of ideas and prices
+
+Bulk loads stream rows into a temporary staging table and then merge them
+into the real tables with one INSERT ... SELECT per table. On PostgreSQL the
+staging table is filled with COPY, which skips per-row statement overhead
+entirely. SQLite has no COPY, so there it is filled with executemany. The
+merge statements are the same on both.
+"""
+
+import csv
+import io
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, insert
+
+# Rows per COPY / executemany call, bounding the memory used for buffers
+COPY_CHUNK = 50000
+
+# Written for None in COPY CSV, so None and '' stay distinguishable
+COPY_NULL = r'\N'
+
+_staging = MetaData()
+
+STAGING_IDEAS = Table(
+    'staging_ideas', _staging,
+    Column('seq', Integer, nullable=False),  # Input position, so earlier duplicates win
+    Column('author_username', String(100), nullable=False),
+    Column('ticker', String(20), nullable=False),
+    Column('company_name', String(200)),
+    Column('posted_date', DateTime, nullable=False),
+    Column('position_type', String(10)),
+    Column('price_at_rec', Float),
+    Column('vic_idea_id', String(50)),
+    Column('idea_url', String(500)),
+    prefixes=['TEMPORARY']
+)
+
+STAGING_PRICES = Table(
+    'staging_prices', _staging,
+    Column('ticker', String(20), nullable=False),
+    Column('current_price', Float),
+    prefixes=['TEMPORARY']
+)
+
+
+def create_staging(connection, table):
+    """Create an empty temporary staging table on connection"""
+    table.drop(connection, checkfirst=True)
+    table.create(connection)
+
+
+def drop_staging(connection, table):
+    table.drop(connection, checkfirst=True)
+
+
+def _csv_value(value):
+    if value is None:
+        return COPY_NULL
+    if hasattr(value, 'isoformat'):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def copy_rows(connection, table, rows):
+    """
+    Append rows to a staging table, with COPY on PostgreSQL.
+
+    Args:
+        connection: SQLAlchemy Connection the staging table was created on
+        table: STAGING_IDEAS or STAGING_PRICES
+        rows: Iterable of dicts keyed by the table's column names
+
+    Returns:
+        Number of rows written
+    """
+    columns = [c.name for c in table.columns]
+    postgres = connection.dialect.name == 'postgresql'
+    copy_sql = (
+        f"COPY {table.name} ({', '.join(columns)}) FROM STDIN "
+        f"WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= COPY_CHUNK:
+            total += _write_chunk(connection, table, columns, chunk, postgres, copy_sql)
+            chunk = []
+    if chunk:
+        total += _write_chunk(connection, table, columns, chunk, postgres, copy_sql)
+    return total
+
+
+def _write_chunk(connection, table, columns, chunk, postgres, copy_sql):
+    if not postgres:
+        connection.execute(insert(table), chunk)
+        return len(chunk)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chunk:
+        writer.writerow([_csv_value(row.get(c)) for c in columns])
+    buffer.seek(0)
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            cursor.copy_expert(copy_sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(copy_sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+    return len(chunk)
@@ -2,29 +2,349 @@
 Database connection and query functions for VIC Leaderboard
 """
 
+import base64
+import hashlib
+import json
 import os
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, desc, func
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import (
+    MetaData, bindparam, case, create_engine, desc, event, exists, func, inspect, literal,
+    select, text, true, update
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.schema import CreateTable
 from contextlib import contextmanager
 
-from .models import Base, Author, Idea, Price, AuthorMetrics, ScrapeLog, CookieStore
+from .models import (
+    Base, Author, Ticker, DailyClose, Idea, Price, AuthorMetrics, Counters, ScrapeLog,
+    ScrapeLogDaily, CookieStore
+)
+from .bulk_load import STAGING_IDEAS, STAGING_PRICES, copy_rows, create_staging, drop_staging
+from .leaderboard_snapshot import SORT_KEYS, LeaderboardSnapshot, write_snapshot
+from .search_index import AuthorSearchIndex
+from .ticker_symbols import normalize_ticker
 
 # Default database path
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'vic_scraper.db')
 
+# SQLAlchemy URL of the database, e.g. postgresql+psycopg2://vic@localhost/vic
+# (unset = the SQLite file at DB_PATH)
+DATABASE_URL = os.environ.get('DATABASE_URL')
+
+# Directory of the leaderboard snapshot and data version files of databases
+# that aren't a local file; each gets its own vic-<hash of the database URL>.*
+STATE_DIR = os.path.dirname(os.path.dirname(__file__))
+
+# INSERT constructs with ON CONFLICT support, per supported backend
+DIALECT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+# SQLite storage profile: WAL lets API reads proceed while the scrape thread
+# writes, and the busy timeout makes writers wait for each other instead of
+# failing with "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',       # Safe with WAL; fsync only at checkpoints
+    'busy_timeout': 10000,         # ms
+    'cache_size': -64000,          # KiB (negative = size, not pages)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY'
+}
+
+# Connections shared by Flask request threads and the scrape thread
+POOL_SIZE = 10
+POOL_MAX_OVERFLOW = 20
+
+# Max bound parameters per IN (...) clause, well under SQLite's limit
+IN_CHUNK = 500
+
+# Materialized rank column for each leaderboard sort field
+RANK_COLUMNS = {'xirr_5yr': 'rank_5yr', 'xirr_3yr': 'rank_3yr', 'xirr_1yr': 'rank_1yr'}
+
+# Rebuilds every rank column in one statement; ties break on id like get_leaderboard
+REBUILD_RANKS_SQL = text('''
+    WITH ranked AS (
+        SELECT id,
+            CASE WHEN xirr_5yr IS NOT NULL
+                 THEN ROW_NUMBER() OVER (ORDER BY xirr_5yr IS NULL, xirr_5yr DESC, id DESC) END AS r5,
+            CASE WHEN xirr_3yr IS NOT NULL
+                 THEN ROW_NUMBER() OVER (ORDER BY xirr_3yr IS NULL, xirr_3yr DESC, id DESC) END AS r3,
+            CASE WHEN xirr_1yr IS NOT NULL
+                 THEN ROW_NUMBER() OVER (ORDER BY xirr_1yr IS NULL, xirr_1yr DESC, id DESC) END AS r1
+        FROM author_metrics
+    )
+    UPDATE author_metrics
+    SET rank_5yr = ranked.r5, rank_3yr = ranked.r3, rank_1yr = ranked.r1
+    FROM ranked
+    WHERE author_metrics.id = ranked.id
+''')
+
+# An idea's percentage return at its ticker's current price
+IDEA_RETURN_EXPR = '''CASE
+        WHEN ideas.price_at_rec > 0 AND prices.current_price > 0 THEN
+            CASE WHEN COALESCE(ideas.position_type, 'long') = 'long'
+                 THEN (prices.current_price - ideas.price_at_rec) / ideas.price_at_rec * 100
+                 ELSE (ideas.price_at_rec - prices.current_price) / ideas.price_at_rec * 100 END
+        END'''
+
+# Recomputes Idea.current_return from the joined Price row; `{filter}` narrows
+# it to the ideas touched by a write. Only ideas whose return changed are
+# written, and their updated_at moves to :returns_at so exports pick them up.
+IDEA_RETURNS_SQL = '''
+    UPDATE ideas
+    SET current_return = {expr}, updated_at = :returns_at
+    FROM prices
+    WHERE prices.ticker_id = ideas.ticker_id
+        AND ideas.current_return {is_distinct} ({expr}){filter}
+'''
+
+# Null-safe inequality operator of each dialect, for IDEA_RETURNS_SQL
+DIALECT_IS_DISTINCT = {'sqlite': 'IS NOT', 'postgresql': 'IS DISTINCT FROM'}
+
+# ScrapeLog rows are compacted into daily summaries once they're this many days old
+SCRAPE_LOG_RAW_DAYS = int(os.environ.get('SCRAPE_LOG_RAW_DAYS', 14))
+
+# Daily summaries are deleted once they're this many days old (0 = keep forever)
+SCRAPE_LOG_SUMMARY_DAYS = int(os.environ.get('SCRAPE_LOG_SUMMARY_DAYS', 730))
+
+# Tables export_rows can read
+EXPORT_TABLES = ('ideas', 'prices', 'author_metrics')
+
+# Rows per export_rows chunk
+EXPORT_CHUNK = 50000
+
+# Lower bound for NULL export watermark timestamps, so those rows sort first
+EXPORT_EPOCH = datetime(1970, 1, 1)
+
+# Rows written this recently are left for the next incremental export: a write
+# stamped before the export's watermark may not have committed yet
+EXPORT_LAG = timedelta(seconds=int(os.environ.get('EXPORT_LAG_SECONDS', 300)))
+
+# AuthorMetrics columns written by metrics runs
+METRIC_FIELDS = ['xirr_5yr', 'xirr_3yr', 'xirr_1yr', 'total_picks', 'win_rate',
+                 'best_pick_ticker', 'best_pick_return']
+
 
 class Database:
     """Database manager for VIC Leaderboard"""
 
-    def __init__(self, db_path=None):
-        self.db_path = db_path or DB_PATH
-        self.engine = create_engine(f'sqlite:///{self.db_path}', echo=False)
+    def __init__(self, db_path=None, pragmas=None, snapshot_path=None, url=None):
+        """
+        Args:
+            db_path: SQLite file path (defaults to backend/vic_scraper.db)
+            pragmas: PRAGMA overrides applied to every SQLite connection
+                     (defaults to SQLITE_PRAGMAS)
+            snapshot_path: Leaderboard snapshot file (defaults to
+                           <db_path>.leaderboard, or a file in STATE_DIR
+                           named after the URL for a database that isn't a
+                           local file)
+            url: SQLAlchemy database URL, overriding db_path (defaults to
+                 DATABASE_URL unless db_path is given)
+
+        Raises:
+            ValueError: If the URL is for a backend other than SQLite or PostgreSQL
+        """
+        url = make_url(url or (None if db_path else DATABASE_URL) or f'sqlite:///{db_path or DB_PATH}')
+        self.dialect = url.get_backend_name()
+        if self.dialect not in DIALECT_INSERTS:
+            raise ValueError(f'Unsupported database backend: {self.dialect}')
+
+        self.db_path = url.database if self.dialect == 'sqlite' else None
+        self.snapshot_path = snapshot_path or self._state_file_path(url, 'leaderboard')
+        # Replaced after every write; see data_version
+        self.version_path = self._state_file_path(url, 'version')
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+        if self.dialect == 'sqlite':
+            engine_args = {'connect_args': {
+                'timeout': self.pragmas.get('busy_timeout', 5000) / 1000,
+                'check_same_thread': False
+            }}
+        else:
+            # Server connections can be dropped between requests
+            engine_args = {'pool_pre_ping': True}
+        self.engine = create_engine(
+            url,
+            echo=False,
+            pool_size=POOL_SIZE,
+            max_overflow=POOL_MAX_OVERFLOW,
+            **engine_args
+        )
+        if self.dialect == 'sqlite':
+            event.listen(self.engine, 'connect', self._apply_pragmas)
         self.Session = scoped_session(sessionmaker(bind=self.engine))
 
+        # Leaderboard row counts per sort field, as (metrics_version, total)
+        self._leaderboard_totals = {}
+
+        # Author search index as (metrics_version, index), rebuilt lazily
+        # on the first search after metrics are written
+        self._search_index = None
+        self._search_index_lock = threading.Lock()
+
+        # Memory-mapped leaderboard snapshot, reopened when the file is replaced
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+
+    def _state_file_path(self, url, extension):
+        """
+        Path of a file kept alongside the database: <db_path>.<extension> for
+        SQLite, else a file in STATE_DIR named after the server's host, port,
+        database and connection options (not the credentials), so databases
+        on different servers don't share one.
+        """
+        if self.db_path:
+            return f'{self.db_path}.{extension}'
+
+        identity = json.dumps([
+            url.get_backend_name(), url.host, url.port, url.database,
+            sorted((k, str(v)) for k, v in url.query.items())
+        ])
+        digest = hashlib.sha1(identity.encode()).hexdigest()[:12]
+        return os.path.join(STATE_DIR, f'vic-{digest}.{extension}')
+
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        """Apply the storage profile to each new SQLite connection"""
+        cursor = dbapi_connection.cursor()
+        for name, value in self.pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
     def init_db(self):
         """Create all tables if they don't exist"""
         Base.metadata.create_all(self.engine)
+        migrated = self._migrate_ticker_keys()
+        added = self._add_missing_columns()
+        self._add_missing_indexes()
+
+        # Ideas are exported by updated_at, which older rows may not have
+        with self.session_scope() as session:
+            session.query(Idea).filter(Idea.updated_at.is_(None)).update(
+                {Idea.updated_at: func.coalesce(Idea.scraped_at, EXPORT_EPOCH)},
+                synchronize_session=False
+            )
+
+        # Backfill persisted returns for databases created before they existed
+        if migrated or ('ideas', 'current_return') in added:
+            self.refresh_idea_returns()
+
+        # Fill in materialized ranks for databases created before they existed
+        if any(('author_metrics', column) in added for column in RANK_COLUMNS.values()):
+            self.rebuild_ranks()
+
+        # Seed the counters row from the existing data
+        with self.session_scope() as session:
+            has_counters = session.get(Counters, 1) is not None
+        if not has_counters:
+            self.reconcile_counters()
+
+        # Make sure the served snapshot matches this database
+        self.publish_leaderboard_snapshot()
+
+    def _add_missing_columns(self):
+        """
+        Add columns introduced after an existing database was created.
+
+        Returns:
+            Set of (table, column) names that were added
+        """
+        inspector = inspect(self.engine)
+        added = set()
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = {c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        conn.execute(text(
+                            f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                        ))
+                        added.add((table.name, column.name))
+        return added
+
+    def _migrate_ticker_keys(self):
+        """
+        Move ideas and prices that store ticker strings over to Ticker ids.
+
+        SQLite can't drop a UNIQUE column or make an added one NOT NULL, so
+        both tables are rebuilt: a copy with the current schema is filled
+        from the old table joined to the tickers, then replaces it. Indexes
+        are recreated afterwards by _add_missing_indexes.
+
+        Returns:
+            True if the database was migrated
+        """
+        inspector = inspect(self.engine)
+        if 'ticker' not in {c['name'] for c in inspector.get_columns('ideas')}:
+            return False
+
+        # Tables the rebuilt copies reference, so their foreign keys compile
+        metadata = MetaData()
+        Author.__table__.to_metadata(metadata)
+        Ticker.__table__.to_metadata(metadata)
+
+        with self.engine.begin() as conn:
+            symbols = conn.execute(text(
+                'SELECT ticker FROM ideas UNION SELECT ticker FROM prices'
+            )).scalars().all()
+            if symbols:
+                conn.execute(
+                    self._insert(Ticker).on_conflict_do_nothing(index_elements=[Ticker.symbol]),
+                    [{'symbol': s, **normalize_ticker(s)} for s in symbols]
+                )
+
+            for table in (Idea.__table__, Price.__table__):
+                old_columns = {c['name'] for c in inspector.get_columns(table.name)}
+                columns = [
+                    c.name for c in table.columns if c.name in old_columns and c.name != 'ticker_id'
+                ]
+                rebuilt = table.to_metadata(metadata, name=f'{table.name}_rebuilt')
+                conn.execute(CreateTable(rebuilt))
+                conn.execute(text(
+                    f"INSERT INTO {rebuilt.name} ({', '.join(columns)}, ticker_id) "
+                    f"SELECT {', '.join(f'{table.name}.{c}' for c in columns)}, tickers.id "
+                    f"FROM {table.name} JOIN tickers ON tickers.symbol = {table.name}.ticker"
+                ))
+                conn.execute(text(f'DROP TABLE {table.name}'))
+                conn.execute(text(f'ALTER TABLE {rebuilt.name} RENAME TO {table.name}'))
+                if self.dialect == 'postgresql':
+                    self._adopt_rebuilt_names(conn, table.name, rebuilt.name)
+
+        if self.dialect == 'sqlite':
+            # Give the space of the dropped tables back to the filesystem
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('VACUUM'))
+        return True
+
+    @staticmethod
+    def _adopt_rebuilt_names(conn, table, rebuilt):
+        """Give a rebuilt PostgreSQL table the old table's sequence and constraint names"""
+        prefix = f'{rebuilt}_'
+        constraints = conn.execute(text(
+            'SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass)'
+        ), {'table': table}).scalars().all()
+        for name in constraints:
+            if name.startswith(prefix):
+                conn.execute(text(
+                    f'ALTER TABLE {table} RENAME CONSTRAINT {name} TO {table}_{name[len(prefix):]}'
+                ))
+        conn.execute(text(f'ALTER SEQUENCE {prefix}id_seq RENAME TO {table}_id_seq'))
+
+        # Ids were copied explicitly, so move the sequence past them
+        conn.execute(text(
+            f"SELECT setval('{table}_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+
+    def _add_missing_indexes(self):
+        """Create indexes introduced after an existing database was created"""
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=conn, checkfirst=True)
 
     @contextmanager
     def session_scope(self):
@@ -39,26 +359,95 @@ class Database:
         finally:
             session.close()
 
+    def _insert(self, model):
+        """INSERT for model with this backend's ON CONFLICT clauses"""
+        return DIALECT_INSERTS[self.dialect](model)
+
+    def _author_insert(self, username):
+        """Insert an author unless the username exists, returning the new id"""
+        return self._insert(Author).values(
+            username=username,
+            username_lower=username.lower(),
+            discovered_at=datetime.utcnow()
+        ).on_conflict_do_nothing(index_elements=[Author.username]).returning(Author.id)
+
+    def _ticker_ids(self, session, symbols, create=True):
+        """
+        Look up the Ticker ids of upper-cased symbols.
+
+        Args:
+            session: Session to run in
+            symbols: Iterable of ticker symbols
+            create: Add Ticker rows for symbols not seen before
+
+        Returns:
+            Dict mapping symbol to Ticker id
+        """
+        symbols = sorted(set(symbols))
+        ids = {}
+        for start in range(0, len(symbols), IN_CHUNK):
+            ids.update(session.query(Ticker.symbol, Ticker.id).filter(
+                Ticker.symbol.in_(symbols[start:start + IN_CHUNK])
+            ))
+
+        missing = [s for s in symbols if s not in ids]
+        if create and missing:
+            # Upsert, so concurrent writers adding the same ticker don't collide
+            session.execute(
+                self._insert(Ticker).on_conflict_do_nothing(index_elements=[Ticker.symbol]),
+                [{'symbol': s, **normalize_ticker(s)} for s in missing]
+            )
+            for start in range(0, len(missing), IN_CHUNK):
+                ids.update(session.query(Ticker.symbol, Ticker.id).filter(
+                    Ticker.symbol.in_(missing[start:start + IN_CHUNK])
+                ))
+        return ids
+
+    def _price_upsert(self):
+        """Insert-or-update of Price rows that only moves price_changed_at on a change"""
+        stmt = self._insert(Price)
+        return stmt.on_conflict_do_update(
+            index_elements=[Price.ticker_id],
+            set_={
+                'current_price': stmt.excluded.current_price,
+                'last_updated': stmt.excluded.last_updated,
+                'fetch_failed': stmt.excluded.fetch_failed,
+                'price_changed_at': case(
+                    (Price.current_price.is_distinct_from(stmt.excluded.current_price),
+                     stmt.excluded.price_changed_at),
+                    else_=Price.price_changed_at
+                )
+            }
+        )
+
+    def _metrics_upsert(self):
+        """Insert-or-update of AuthorMetrics rows keyed by author"""
+        stmt = self._insert(AuthorMetrics)
+        return stmt.on_conflict_do_update(
+            index_elements=[AuthorMetrics.author_id],
+            set_={field: stmt.excluded[field] for field in METRIC_FIELDS + ['calculated_at']}
+        )
+
     # ==================== Author Operations ====================
 
     def get_or_create_author(self, username):
         """Get existing author or create new one"""
         with self.session_scope() as session:
-            author = session.query(Author).filter_by(username=username).first()
-            if not author:
-                author = Author(
-                    username=username,
-                    username_lower=username.lower(),
-                    discovered_at=datetime.utcnow()
-                )
-                session.add(author)
-                session.flush()  # Get the ID
-            return {
+            # Upsert, so concurrent scrapes discovering the same author don't collide
+            created = session.execute(self._author_insert(username)).first() is not None
+            if created:
+                self._bump_counters(session, authors=1)
+            author = session.query(Author).filter_by(username=username).one()
+            result = {
                 'id': author.id,
                 'username': author.username,
                 'last_scraped_at': author.last_scraped_at
             }
 
+        if created:
+            self._bump_data_version()
+        return result
+
     def update_author_scraped(self, username):
         """Update the last_scraped_at timestamp for an author"""
         with self.session_scope() as session:
@@ -79,40 +468,251 @@ class Database:
         """Add a new idea to the database"""
         with self.session_scope() as session:
             # Get or create author
-            author = session.query(Author).filter_by(username=author_username).first()
-            if not author:
-                author = Author(
-                    username=author_username,
-                    username_lower=author_username.lower()
-                )
-                session.add(author)
-                session.flush()
+            author_id = session.execute(self._author_insert(author_username)).scalar()
+            author_created = author_id is not None
+            if author_created:
+                self._bump_counters(session, authors=1)
+            else:
+                author_id = session.query(Author.id).filter_by(username=author_username).scalar()
 
             # Check if idea already exists (by vic_idea_id or idea_url)
+            existing = None
             if vic_idea_id:
-                existing = session.query(Idea).filter_by(vic_idea_id=vic_idea_id).first()
-                if existing:
-                    return {'id': existing.id, 'exists': True}
-
-            if idea_url:
-                existing = session.query(Idea).filter_by(idea_url=idea_url).first()
-                if existing:
-                    return {'id': existing.id, 'exists': True}
-
-            # Create new idea
-            idea = Idea(
-                author_id=author.id,
-                ticker=ticker.upper(),
-                company_name=company_name,
-                posted_date=posted_date,
-                position_type=position_type,
-                price_at_rec=price_at_rec,
-                vic_idea_id=vic_idea_id,
-                idea_url=idea_url
+                existing = session.query(Idea.id).filter_by(vic_idea_id=vic_idea_id).scalar()
+            if existing is None and idea_url:
+                existing = session.query(Idea.id).filter_by(idea_url=idea_url).scalar()
+
+            if existing is None:
+                # Create new idea, unless another writer just inserted the same vic_idea_id
+                ticker_id = self._ticker_ids(session, [ticker.upper()])[ticker.upper()]
+                idea_id = session.execute(
+                    self._insert(Idea).values(
+                        author_id=author_id,
+                        ticker_id=ticker_id,
+                        company_name=company_name,
+                        posted_date=posted_date,
+                        position_type=position_type,
+                        price_at_rec=price_at_rec,
+                        vic_idea_id=vic_idea_id,
+                        idea_url=idea_url
+                    ).on_conflict_do_nothing(index_elements=[Idea.vic_idea_id]).returning(Idea.id)
+                ).scalar()
+                if idea_id is None:
+                    existing = session.query(Idea.id).filter_by(vic_idea_id=vic_idea_id).scalar()
+                else:
+                    self._refresh_idea_returns(session, idea_ids=[idea_id])
+                    self._bump_counters(session, ideas=1)
+
+        # A new author changes the counts even when their idea already existed
+        if author_created or existing is None:
+            self._bump_data_version()
+        if existing is not None:
+            return {'id': existing, 'exists': True}
+        return {'id': idea_id, 'exists': False}
+
+    def add_ideas_bulk(self, ideas):
+        """
+        Add many ideas in one transaction.
+
+        Authors are resolved (or created) in one pass and ideas are deduped
+        against existing rows by vic_idea_id / idea_url with set-based lookups,
+        so the number of round-trips doesn't grow with the number of ideas.
+
+        Args:
+            ideas: List of dicts with the add_idea arguments (author_username,
+                   ticker, posted_date, and optionally position_type,
+                   price_at_rec, company_name, vic_idea_id, idea_url)
+
+        Returns:
+            List of {'id', 'exists'} dicts in the same order as `ideas`
+        """
+        if not ideas:
+            return []
+
+        with self.session_scope() as session:
+            # Resolve or create every author
+            usernames = sorted({i['author_username'] for i in ideas})
+            author_ids = {}
+            for start in range(0, len(usernames), IN_CHUNK):
+                chunk = usernames[start:start + IN_CHUNK]
+                author_ids.update(
+                    session.query(Author.username, Author.id).filter(Author.username.in_(chunk))
+                )
+
+            missing = [u for u in usernames if u not in author_ids]
+            new_authors = []
+            if missing:
+                # Upsert, so concurrent writers adding the same author don't collide
+                now = datetime.utcnow()
+                new_authors = session.execute(
+                    self._insert(Author).on_conflict_do_nothing(
+                        index_elements=[Author.username]
+                    ).returning(Author.username, Author.id),
+                    [{'username': u, 'username_lower': u.lower(), 'discovered_at': now}
+                     for u in missing]
+                ).all()
+                author_ids.update(new_authors)
+
+                # Authors another writer added since the lookup above
+                raced = [u for u in missing if u not in author_ids]
+                for start in range(0, len(raced), IN_CHUNK):
+                    author_ids.update(session.query(Author.username, Author.id).filter(
+                        Author.username.in_(raced[start:start + IN_CHUNK])
+                    ))
+
+            # Existing ideas matching any vic_idea_id or idea_url in the batch
+            vic_ids = sorted({i['vic_idea_id'] for i in ideas if i.get('vic_idea_id')})
+            urls = sorted({i['idea_url'] for i in ideas if i.get('idea_url')})
+            by_vic_id = {}
+            by_url = {}
+            for start in range(0, len(vic_ids), IN_CHUNK):
+                by_vic_id.update(session.query(Idea.vic_idea_id, Idea.id).filter(
+                    Idea.vic_idea_id.in_(vic_ids[start:start + IN_CHUNK])
+                ))
+            for start in range(0, len(urls), IN_CHUNK):
+                by_url.update(session.query(Idea.idea_url, Idea.id).filter(
+                    Idea.idea_url.in_(urls[start:start + IN_CHUNK])
+                ))
+
+            ticker_ids = self._ticker_ids(session, (i['ticker'].upper() for i in ideas))
+
+            results = []
+            new_ideas = []
+            for data in ideas:
+                vic_idea_id = data.get('vic_idea_id')
+                idea_url = data.get('idea_url')
+
+                existing = by_vic_id.get(vic_idea_id) if vic_idea_id else None
+                if existing is None and idea_url:
+                    existing = by_url.get(idea_url)
+                if existing is not None:
+                    # Either an Idea id or a pending Idea added earlier in this batch
+                    results.append({'id': existing, 'exists': True})
+                    continue
+
+                idea = Idea(
+                    author_id=author_ids[data['author_username']],
+                    ticker_id=ticker_ids[data['ticker'].upper()],
+                    company_name=data.get('company_name'),
+                    posted_date=data['posted_date'],
+                    position_type=data.get('position_type', 'long'),
+                    price_at_rec=data.get('price_at_rec'),
+                    vic_idea_id=vic_idea_id,
+                    idea_url=idea_url
+                )
+                new_ideas.append(idea)
+                results.append({'id': idea, 'exists': False})
+
+                # Later duplicates within the same batch resolve to this idea
+                if vic_idea_id:
+                    by_vic_id[vic_idea_id] = idea
+                if idea_url:
+                    by_url[idea_url] = idea
+
+            if new_ideas:
+                session.add_all(new_ideas)
+                session.flush()
+
+            for result in results:
+                if isinstance(result['id'], Idea):
+                    result['id'] = result['id'].id
+
+            if new_ideas:
+                self._refresh_idea_returns(session, idea_ids=[i.id for i in new_ideas])
+            self._bump_counters(session, authors=len(new_authors), ideas=len(new_ideas))
+
+        if new_authors or new_ideas:
+            self._bump_data_version()
+        return results
+
+    def load_ideas_bulk(self, ideas):
+        """
+        Load a large batch of ideas through a staging table (COPY on PostgreSQL).
+
+        For initial imports and backfills, where add_ideas_bulk's per-idea
+        results aren't needed. Ideas are deduped by vic_idea_id / idea_url
+        against each other (first one wins) and against existing rows, and
+        missing authors are created.
+
+        Args:
+            ideas: Iterable of dicts with the add_idea arguments
+
+        Returns:
+            Dict with the number of 'authors' and 'ideas' inserted
+        """
+        seen_vic_ids = set()
+        seen_urls = set()
+        symbols = set()
+
+        def staged_rows():
+            for seq, data in enumerate(ideas):
+                vic_idea_id = data.get('vic_idea_id')
+                idea_url = data.get('idea_url')
+                if vic_idea_id in seen_vic_ids or idea_url in seen_urls:
+                    continue
+                if vic_idea_id:
+                    seen_vic_ids.add(vic_idea_id)
+                if idea_url:
+                    seen_urls.add(idea_url)
+                symbols.add(data['ticker'].upper())
+                yield {
+                    'seq': seq,
+                    'author_username': data['author_username'],
+                    'ticker': data['ticker'].upper(),
+                    'company_name': data.get('company_name'),
+                    'posted_date': data['posted_date'],
+                    'position_type': data.get('position_type', 'long'),
+                    'price_at_rec': data.get('price_at_rec'),
+                    'vic_idea_id': vic_idea_id,
+                    'idea_url': idea_url
+                }
+
+        now = datetime.utcnow()
+        staged = STAGING_IDEAS.c
+        with self.session_scope() as session:
+            connection = session.connection()
+            create_staging(connection, STAGING_IDEAS)
+            copy_rows(connection, STAGING_IDEAS, staged_rows())
+            self._ticker_ids(session, symbols)
+
+            new_authors = session.execute(
+                self._insert(Author).from_select(
+                    ['username', 'username_lower', 'discovered_at'],
+                    # WHERE keeps SQLite from parsing ON CONFLICT as a join clause
+                    select(staged.author_username, func.lower(staged.author_username),
+                           literal(now)).where(true()).distinct()
+                ).on_conflict_do_nothing(index_elements=[Author.username])
+            ).rowcount
+
+            new_ideas = session.execute(
+                self._insert(Idea).from_select(
+                    ['author_id', 'ticker_id', 'company_name', 'posted_date', 'position_type',
+                     'price_at_rec', 'vic_idea_id', 'idea_url', 'scraped_at', 'updated_at'],
+                    select(
+                        Author.id, Ticker.id, staged.company_name, staged.posted_date,
+                        staged.position_type, staged.price_at_rec, staged.vic_idea_id,
+                        staged.idea_url, literal(now), literal(now)
+                    ).select_from(STAGING_IDEAS).join(
+                        Author, Author.username == staged.author_username
+                    ).join(
+                        Ticker, Ticker.symbol == staged.ticker
+                    ).where(
+                        ~exists().where(Idea.vic_idea_id == staged.vic_idea_id),
+                        ~exists().where(Idea.idea_url == staged.idea_url)
+                    ).order_by(staged.seq)
+                ).on_conflict_do_nothing()
+            ).rowcount
+
+            session.execute(
+                self._idea_returns_sql(' AND ideas.scraped_at = :loaded_at'),
+                {'loaded_at': now, 'returns_at': now}
             )
-            session.add(idea)
-            session.flush()
-            return {'id': idea.id, 'exists': False}
+            self._bump_counters(session, authors=new_authors, ideas=new_ideas)
+            drop_staging(connection, STAGING_IDEAS)
+
+        if new_authors or new_ideas:
+            self._bump_data_version()
+        return {'authors': new_authors, 'ideas': new_ideas}
 
     def get_ideas_for_author(self, author_username, years=5):
         """Get ideas for an author within the past N years"""
@@ -123,34 +723,96 @@ class Database:
             if not author:
                 return []
 
-            ideas = session.query(Idea).filter(
+            ideas = session.query(
+                Idea.id, Ticker.symbol, Idea.company_name, Idea.posted_date, Idea.position_type,
+                Idea.price_at_rec, Idea.current_return, Idea.idea_url
+            ).join(
+                Ticker, Ticker.id == Idea.ticker_id
+            ).filter(
                 Idea.author_id == author.id,
                 Idea.posted_date >= cutoff_date
             ).order_by(desc(Idea.posted_date)).all()
 
             return [{
                 'id': i.id,
-                'ticker': i.ticker,
+                'ticker': i.symbol,
                 'company_name': i.company_name,
                 'posted_date': i.posted_date.isoformat() if i.posted_date else None,
                 'position_type': i.position_type,
                 'price_at_rec': i.price_at_rec,
+                'current_return': i.current_return,
                 'idea_url': i.idea_url
             } for i in ideas]
 
+    def get_ideas_for_authors(self, author_ids=None, years=5):
+        """
+        Get ideas within the past N years for many authors in one ordered pass.
+
+        Args:
+            author_ids: Author IDs to load (None = every author)
+            years: Only include ideas from the past N years
+
+        Returns:
+            Dict mapping username to list of idea dicts, newest first
+            (same shape as get_ideas_for_author)
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=years * 365)
+
+        with self.session_scope() as session:
+            # The ticker dimension is small; resolve ids here rather than join it per idea
+            symbols = dict(session.query(Ticker.id, Ticker.symbol))
+            query = session.query(
+                Author.username, Idea.id, Idea.ticker_id, Idea.company_name, Idea.posted_date,
+                Idea.position_type, Idea.price_at_rec, Idea.current_return, Idea.idea_url
+            ).join(
+                Author, Author.id == Idea.author_id
+            ).filter(
+                Idea.posted_date >= cutoff_date
+            )
+
+            if author_ids is None:
+                queries = [query]
+            else:
+                author_ids = sorted(author_ids)
+                queries = [
+                    query.filter(Idea.author_id.in_(author_ids[i:i + IN_CHUNK]))
+                    for i in range(0, len(author_ids), IN_CHUNK)
+                ]
+
+            ideas_by_author = {}
+            for q in queries:
+                rows = q.order_by(Idea.author_id, desc(Idea.posted_date)).yield_per(5000)
+                for r in rows:
+                    ideas_by_author.setdefault(r.username, []).append({
+                        'id': r.id,
+                        'ticker': symbols[r.ticker_id],
+                        'company_name': r.company_name,
+                        'posted_date': r.posted_date.isoformat() if r.posted_date else None,
+                        'position_type': r.position_type,
+                        'price_at_rec': r.price_at_rec,
+                        'current_return': r.current_return,
+                        'idea_url': r.idea_url
+                    })
+
+            return ideas_by_author
+
     def get_ideas_needing_prices(self, limit=100):
         """Get ideas that need price_at_rec fetched"""
         five_years_ago = datetime.utcnow() - timedelta(days=5 * 365)
 
         with self.session_scope() as session:
-            ideas = session.query(Idea).filter(
+            ideas = session.query(
+                Idea.id, Ticker.symbol, Idea.posted_date, Idea.idea_url
+            ).join(
+                Ticker, Ticker.id == Idea.ticker_id
+            ).filter(
                 Idea.price_at_rec.is_(None),
                 Idea.posted_date >= five_years_ago
             ).limit(limit).all()
 
             return [{
                 'id': i.id,
-                'ticker': i.ticker,
+                'ticker': i.symbol,
                 'posted_date': i.posted_date.isoformat() if i.posted_date else None,
                 'idea_url': i.idea_url
             } for i in ideas]
@@ -161,200 +823,959 @@ class Database:
             idea = session.query(Idea).get(idea_id)
             if idea:
                 idea.price_at_rec = price_at_rec
+                session.flush()
+                self._refresh_idea_returns(session, idea_ids=[idea_id])
+
+        self._bump_data_version()
 
     # ==================== Price Operations ====================
 
     def update_price(self, ticker, current_price, fetch_failed=False):
         """Update or create a price record"""
+        now = datetime.utcnow()
         with self.session_scope() as session:
-            price = session.query(Price).filter_by(ticker=ticker.upper()).first()
-            if price:
-                price.current_price = current_price
-                price.last_updated = datetime.utcnow()
-                price.fetch_failed = fetch_failed
-            else:
-                price = Price(
-                    ticker=ticker.upper(),
-                    current_price=current_price,
-                    fetch_failed=fetch_failed
-                )
-                session.add(price)
+            ticker_id = self._ticker_ids(session, [ticker.upper()])[ticker.upper()]
+            session.execute(self._price_upsert(), {
+                'ticker_id': ticker_id,
+                'current_price': current_price,
+                'last_updated': now,
+                'price_changed_at': now,
+                'fetch_failed': fetch_failed
+            })
+            self._refresh_idea_returns(session, ticker_ids=[ticker_id])
+
+        self._bump_data_version()
+
+    def update_prices_bulk(self, prices):
+        """
+        Write many ticker prices and fan them out to idea returns in one transaction.
+
+        Prices are upserted with a single statement, and the returns of every
+        idea on a ticker whose price actually changed are refreshed with one
+        UPDATE per IN_CHUNK tickers, so the cost scales with distinct tickers
+        rather than with ideas.
+
+        Args:
+            prices: Dict mapping ticker to current price (None = fetch failed)
+
+        Returns:
+            Number of tickers whose price changed
+        """
+        if not prices:
+            return 0
+
+        now = datetime.utcnow()
+        with self.session_scope() as session:
+            ticker_ids = self._ticker_ids(session, (ticker.upper() for ticker in prices))
+            new_prices = {ticker_ids[ticker.upper()]: price for ticker, price in prices.items()}
+
+            ids = sorted(new_prices)
+            old_prices = {}
+            for start in range(0, len(ids), IN_CHUNK):
+                old_prices.update(session.query(Price.ticker_id, Price.current_price).filter(
+                    Price.ticker_id.in_(ids[start:start + IN_CHUNK])
+                ))
+            changed = [
+                t for t in ids
+                if t not in old_prices or old_prices[t] != new_prices[t]
+            ]
+
+            session.execute(self._price_upsert(), [{
+                'ticker_id': ticker_id,
+                'current_price': price,
+                'last_updated': now,
+                'price_changed_at': now,
+                'fetch_failed': price is None
+            } for ticker_id, price in new_prices.items()])
+            if changed:
+                self._refresh_idea_returns(session, ticker_ids=changed)
+
+        self._bump_data_version()
+        return len(changed)
+
+    def load_prices_bulk(self, prices):
+        """
+        Load a large batch of prices through a staging table (COPY on PostgreSQL).
+
+        Same effect as update_prices_bulk, but the rows reach the database
+        as one COPY stream instead of one bound statement per ticker.
+
+        Args:
+            prices: Dict mapping ticker to current price (None = fetch failed)
+
+        Returns:
+            Number of tickers whose price changed
+        """
+        if not prices:
+            return 0
+
+        now = datetime.utcnow()
+        staged = STAGING_PRICES.c
+        rows = {ticker.upper(): price for ticker, price in prices.items()}
+        with self.session_scope() as session:
+            connection = session.connection()
+            create_staging(connection, STAGING_PRICES)
+            copy_rows(connection, STAGING_PRICES, (
+                {'ticker': ticker, 'current_price': price} for ticker, price in rows.items()
+            ))
+            self._ticker_ids(session, rows)
+            session.execute(self._price_upsert().from_select(
+                ['ticker_id', 'current_price', 'last_updated', 'price_changed_at', 'fetch_failed'],
+                select(Ticker.id, staged.current_price, literal(now), literal(now),
+                       staged.current_price.is_(None)).select_from(STAGING_PRICES).join(
+                    Ticker, Ticker.symbol == staged.ticker
+                ).where(true())
+            ))
+
+            # Upserted rows whose price changed carry the load timestamp
+            changed = session.query(func.count(Price.id)).filter(
+                Price.price_changed_at == now
+            ).scalar()
+            session.execute(
+                self._idea_returns_sql(' AND prices.price_changed_at = :loaded_at'),
+                {'loaded_at': now, 'returns_at': now}
+            )
+            drop_staging(connection, STAGING_PRICES)
+
+        self._bump_data_version()
+        return changed
+
+    def refresh_idea_returns(self, tickers=None):
+        """
+        Recompute persisted idea returns from current prices.
+
+        Args:
+            tickers: Only refresh ideas for these tickers (None = every idea)
+        """
+        with self.session_scope() as session:
+            ticker_ids = None
+            if tickers is not None:
+                ticker_ids = self._ticker_ids(
+                    session, (t.upper() for t in tickers), create=False
+                ).values()
+            self._refresh_idea_returns(session, ticker_ids=ticker_ids)
+
+        self._bump_data_version()
+
+    def _idea_returns_sql(self, filter=''):
+        """IDEA_RETURNS_SQL for this database's dialect, narrowed by `filter`"""
+        return text(IDEA_RETURNS_SQL.format(
+            expr=IDEA_RETURN_EXPR, is_distinct=DIALECT_IS_DISTINCT[self.dialect], filter=filter
+        ))
+
+    def _refresh_idea_returns(self, session, ticker_ids=None, idea_ids=None):
+        """Run IDEA_RETURNS_SQL inside session, narrowed to Ticker ids or idea IDs"""
+        now = datetime.utcnow()
+        if ticker_ids is None and idea_ids is None:
+            session.execute(self._idea_returns_sql(), {'returns_at': now})
+            return
+
+        column, values = (
+            ('ticker_id', ticker_ids) if ticker_ids is not None else ('id', idea_ids)
+        )
+        values = sorted(set(values))
+        stmt = self._idea_returns_sql(
+            f' AND ideas.{column} IN :values'
+        ).bindparams(bindparam('values', expanding=True))
+        for start in range(0, len(values), IN_CHUNK):
+            session.execute(stmt, {'values': values[start:start + IN_CHUNK], 'returns_at': now})
 
     def get_all_prices(self):
         """Get all current prices as a dict"""
         with self.session_scope() as session:
-            prices = session.query(Price).all()
-            return {p.ticker: p.current_price for p in prices if p.current_price}
+            prices = session.query(Ticker.symbol, Price.current_price).join(
+                Ticker, Ticker.id == Price.ticker_id
+            )
+            return {p.symbol: p.current_price for p in prices if p.current_price}
 
     def get_price(self, ticker):
         """Get current price for a ticker"""
         with self.session_scope() as session:
-            price = session.query(Price).filter_by(ticker=ticker.upper()).first()
-            return price.current_price if price else None
+            return session.query(Price.current_price).join(
+                Ticker, Ticker.id == Price.ticker_id
+            ).filter(Ticker.symbol == ticker.upper()).scalar()
 
     def get_tickers_needing_update(self, max_age_hours=24):
         """Get tickers that need price updates"""
         cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
 
         with self.session_scope() as session:
-            # Get all unique tickers from ideas
-            all_tickers = session.query(Idea.ticker).distinct().all()
-            all_tickers = {t[0] for t in all_tickers}
-
-            # Get tickers with recent prices
-            recent_prices = session.query(Price.ticker).filter(
+            # Tickers with ideas but without a fresh, successful price: a
+            # semi-join and an anti-join over the ticker dimension, so ideas
+            # are only probed by index and never scanned for DISTINCT
+            has_ideas = session.query(Idea.id).filter(Idea.ticker_id == Ticker.id).exists()
+            fresh_price = session.query(Price.id).filter(
+                Price.ticker_id == Ticker.id,
                 Price.last_updated >= cutoff,
                 Price.fetch_failed == False
-            ).all()
-            recent_tickers = {p[0] for p in recent_prices}
+            ).exists()
+            rows = session.query(Ticker.symbol).filter(has_ideas, ~fresh_price)
+
+            return [r.symbol for r in rows]
 
-            # Return tickers needing update
-            return list(all_tickers - recent_tickers)
+    def get_yahoo_symbols(self, tickers):
+        """
+        Get the Yahoo Finance symbols of tickers.
+
+        Args:
+            tickers: Ticker symbols as stored on ideas
+
+        Returns:
+            Dict mapping ticker to Yahoo symbol (None if it has no known one);
+            tickers not in the database are left out
+        """
+        tickers = sorted({t.upper() for t in tickers})
+        with self.session_scope() as session:
+            symbols = {}
+            for start in range(0, len(tickers), IN_CHUNK):
+                symbols.update(session.query(Ticker.symbol, Ticker.yahoo_symbol).filter(
+                    Ticker.symbol.in_(tickers[start:start + IN_CHUNK])
+                ))
+            return symbols
+
+    # ==================== Daily Close Operations ====================
+
+    def get_daily_closes(self, ticker):
+        """
+        Get the stored daily close history of a ticker.
+
+        Args:
+            ticker: Ticker symbol
+
+        Returns:
+            Dict with 'yahoo_symbol', the fetched span 'closes_from' and
+            'closes_to' (None if nothing was fetched yet), and parallel
+            'days'/'closes' lists sorted by day
+        """
+        ticker = ticker.upper()
+        with self.session_scope() as session:
+            row = session.query(Ticker).filter(Ticker.symbol == ticker).first()
+            if not row:
+                return {
+                    'yahoo_symbol': normalize_ticker(ticker)['yahoo_symbol'],
+                    'closes_from': None, 'closes_to': None, 'days': [], 'closes': []
+                }
+
+            closes = session.query(DailyClose.day, DailyClose.close).filter(
+                DailyClose.ticker_id == row.id
+            ).order_by(DailyClose.day).all()
+
+            return {
+                'yahoo_symbol': row.yahoo_symbol,
+                'closes_from': row.closes_from,
+                'closes_to': row.closes_to,
+                'days': [c.day for c in closes],
+                'closes': [c.close for c in closes]
+            }
+
+    def save_daily_closes(self, ticker, closes, fetched_from, fetched_to):
+        """
+        Store fetched daily closes of a ticker and widen its fetched span.
+
+        The span must adjoin or overlap the one already stored, so that
+        every trading day between closes_from and closes_to is known.
+
+        Args:
+            ticker: Ticker symbol
+            closes: Dict mapping date to closing price
+            fetched_from: First day of the fetched range
+            fetched_to: Last day of the fetched range
+        """
+        ticker = ticker.upper()
+        with self.session_scope() as session:
+            ticker_id = self._ticker_ids(session, [ticker])[ticker]
+
+            if closes:
+                stmt = self._insert(DailyClose)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[DailyClose.ticker_id, DailyClose.day],
+                        set_={'close': stmt.excluded.close}
+                    ),
+                    [{'ticker_id': ticker_id, 'day': day, 'close': close}
+                     for day, close in closes.items()]
+                )
+
+            row = session.get(Ticker, ticker_id)
+            row.closes_from = min(filter(None, [row.closes_from, fetched_from]))
+            row.closes_to = max(filter(None, [row.closes_to, fetched_to]))
 
     # ==================== Metrics Operations ====================
 
     def update_author_metrics(self, author_username, xirr_5yr=None, xirr_3yr=None,
                                xirr_1yr=None, total_picks=0, win_rate=None,
-                               best_pick_ticker=None, best_pick_return=None):
-        """Update or create metrics for an author"""
+                               best_pick_ticker=None, best_pick_return=None,
+                               rebuild_ranks=True):
+        """
+        Update or create metrics for an author.
+
+        Pass rebuild_ranks=False when writing many authors one at a time and
+        call rebuild_ranks() once at the end instead.
+        """
         with self.session_scope() as session:
             author = session.query(Author).filter_by(username=author_username).first()
             if not author:
                 return False
 
-            metrics = session.query(AuthorMetrics).filter_by(author_id=author.id).first()
-            if metrics:
-                metrics.xirr_5yr = xirr_5yr
-                metrics.xirr_3yr = xirr_3yr
-                metrics.xirr_1yr = xirr_1yr
-                metrics.total_picks = total_picks
-                metrics.win_rate = win_rate
-                metrics.best_pick_ticker = best_pick_ticker
-                metrics.best_pick_return = best_pick_return
-                metrics.calculated_at = datetime.utcnow()
-            else:
-                metrics = AuthorMetrics(
-                    author_id=author.id,
-                    username=author_username,
-                    username_lower=author_username.lower(),
-                    xirr_5yr=xirr_5yr,
-                    xirr_3yr=xirr_3yr,
-                    xirr_1yr=xirr_1yr,
-                    total_picks=total_picks,
-                    win_rate=win_rate,
-                    best_pick_ticker=best_pick_ticker,
-                    best_pick_return=best_pick_return
-                )
-                session.add(metrics)
-            return True
+            now = datetime.utcnow()
+            existed = session.query(AuthorMetrics.id).filter_by(author_id=author.id).first()
+            session.execute(self._metrics_upsert(), {
+                'author_id': author.id,
+                'username': author_username,
+                'username_lower': author_username.lower(),
+                'xirr_5yr': xirr_5yr,
+                'xirr_3yr': xirr_3yr,
+                'xirr_1yr': xirr_1yr,
+                'total_picks': total_picks,
+                'win_rate': win_rate,
+                'best_pick_ticker': best_pick_ticker,
+                'best_pick_return': best_pick_return,
+                'calculated_at': now
+            })
+            self._bump_counters(
+                session, last_metrics_at=now, authors_with_metrics=0 if existed else 1
+            )
 
-    def get_leaderboard(self, sort_by='xirr_5yr', limit=50, offset=0):
-        """Get leaderboard data sorted by XIRR"""
-        sort_field = getattr(AuthorMetrics, sort_by, AuthorMetrics.xirr_5yr)
+            if rebuild_ranks:
+                session.execute(REBUILD_RANKS_SQL)
+
+        self._invalidate_leaderboard_cache()
+        if rebuild_ranks:
+            self.publish_leaderboard_snapshot()
+        return True
+
+    def update_author_metrics_bulk(self, rows):
+        """
+        Insert or update metrics for many authors in one transaction.
+
+        Args:
+            rows: List of dicts with author_id, username and the metric fields
+                  accepted by update_author_metrics
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        now = datetime.utcnow()
+        values = [{
+            'author_id': r['author_id'],
+            'username': r['username'],
+            'username_lower': r['username'].lower(),
+            **{field: r.get(field) for field in METRIC_FIELDS},
+            'calculated_at': now
+        } for r in rows]
+        for v in values:
+            v['total_picks'] = v['total_picks'] or 0
 
         with self.session_scope() as session:
-            query = session.query(AuthorMetrics).filter(
-                sort_field.isnot(None)
-            ).order_by(desc(sort_field))
+            author_ids = sorted(v['author_id'] for v in values)
+            existing = sum(
+                session.query(func.count(AuthorMetrics.id)).filter(
+                    AuthorMetrics.author_id.in_(author_ids[start:start + IN_CHUNK])
+                ).scalar()
+                for start in range(0, len(author_ids), IN_CHUNK)
+            )
+
+            session.execute(self._metrics_upsert(), values)
+            session.execute(REBUILD_RANKS_SQL)
+            self._bump_counters(
+                session, last_metrics_at=now, authors_with_metrics=len(values) - existing
+            )
+
+        self._invalidate_leaderboard_cache()
+        self.publish_leaderboard_snapshot()
+        return len(values)
 
-            total = query.count()
-            metrics = query.offset(offset).limit(limit).all()
+    def rebuild_ranks(self):
+        """Recompute every author's materialized leaderboard ranks"""
+        with self.session_scope() as session:
+            session.execute(REBUILD_RANKS_SQL)
+
+        self._invalidate_leaderboard_cache()
+        self.publish_leaderboard_snapshot()
+
+    def publish_leaderboard_snapshot(self):
+        """
+        Write the leaderboard snapshot served by get_leaderboard.
+
+        Called after every metrics write that rebuilds ranks, so the snapshot
+        always reflects the last complete set of metrics and ranks.
+        """
+        with self.session_scope() as session:
+            rows = [row._asdict() for row in session.query(
+                AuthorMetrics.id, AuthorMetrics.username, AuthorMetrics.xirr_5yr,
+                AuthorMetrics.xirr_3yr, AuthorMetrics.xirr_1yr, AuthorMetrics.total_picks,
+                AuthorMetrics.win_rate, AuthorMetrics.best_pick_ticker,
+                AuthorMetrics.best_pick_return, AuthorMetrics.calculated_at
+            )]
 
+        write_snapshot(self.snapshot_path, rows)
+
+    def _get_snapshot(self):
+        """The current leaderboard snapshot, or None if there isn't a readable one"""
+        try:
+            identity = LeaderboardSnapshot.file_identity(os.stat(self.snapshot_path))
+        except OSError:
+            return None
+
+        snapshot = self._snapshot
+        if snapshot and snapshot.identity == identity:
+            return snapshot
+
+        with self._snapshot_lock:
+            try:
+                # Replaced files keep their old mapping alive for in-flight readers
+                self._snapshot = LeaderboardSnapshot(self.snapshot_path)
+            except (OSError, ValueError):
+                self._snapshot = None
+            return self._snapshot
+
+    def _invalidate_leaderboard_cache(self):
+        """
+        Drop cached leaderboard totals and the search index after metrics
+        change (other processes see the new _metrics_version instead)
+        """
+        self._leaderboard_totals.clear()
+        self._search_index = None
+        self._bump_data_version()
+
+    def _bump_counters(self, session, last_metrics_at=None, **deltas):
+        """
+        Adjust the counters row inside the caller's transaction.
+
+        Args:
+            session: Session of the write being counted
+            last_metrics_at: New last metrics timestamp, if metrics were written
+            **deltas: Amounts to add to counter columns (authors, ideas,
+                      authors_with_metrics)
+        """
+        values = {
+            name: getattr(Counters, name) + delta for name, delta in deltas.items() if delta
+        }
+        if last_metrics_at is not None:
+            values['last_metrics_at'] = last_metrics_at
+        if values:
+            session.execute(update(Counters).where(Counters.id == 1).values(values))
+
+    def reconcile_counters(self):
+        """
+        Recompute the counters row from the tables it summarizes.
+
+        Write paths keep it current, so this only matters after rows were
+        written or removed outside Database (bulk loads, manual edits).
+
+        Returns:
+            Dict mapping each counter to {'before', 'after'} for counters that drifted
+        """
+        with self.session_scope() as session:
+            actual = self._count_totals(session)
+
+            counters = session.get(Counters, 1)
+            if counters is None:
+                counters = Counters(id=1)
+                session.add(counters)
+
+            drift = {}
+            for name, value in actual.items():
+                if getattr(counters, name) != value:
+                    drift[name] = {'before': getattr(counters, name), 'after': value}
+                    setattr(counters, name, value)
+
+        if drift:
+            self._bump_data_version()
+        return drift
+
+    def _count_totals(self, session):
+        """Counter values computed directly from the tables"""
+        return {
+            'authors': session.query(func.count(Author.id)).scalar(),
+            'ideas': session.query(func.count(Idea.id)).scalar(),
+            'authors_with_metrics': session.query(func.count(AuthorMetrics.id)).scalar(),
+            'last_metrics_at': session.query(func.max(AuthorMetrics.calculated_at)).scalar()
+        }
+
+    def _get_counters(self, session):
+        """The counters row (computed on the fly if init_db hasn't seeded it)"""
+        return session.get(Counters, 1) or Counters(id=1, **self._count_totals(session))
+
+    @property
+    def data_version(self):
+        """
+        Version of the data behind API responses: the identity of the version
+        file, which every write replaces, so all processes on this database
+        see the same one. Read-side caches stay valid only while it is
+        unchanged. Checking it is a stat(), not a query.
+        """
+        try:
+            stat = os.stat(self.version_path)
+        except FileNotFoundError:
+            return '0'
+        return f'{stat.st_ino:x}.{stat.st_mtime_ns:x}'
+
+    def _bump_data_version(self):
+        """Mark every cached read response as stale, in every process"""
+        # A fresh file each time: its inode differs from the one it replaces
+        directory = os.path.dirname(os.path.abspath(self.version_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.version-', dir=directory)
+        os.close(fd)
+        try:
+            os.replace(tmp_path, self.version_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get_author_xirrs(self):
+        """Get each author's last calculated XIRRs, keyed by username"""
+        with self.session_scope() as session:
+            rows = session.query(
+                AuthorMetrics.username, AuthorMetrics.xirr_5yr,
+                AuthorMetrics.xirr_3yr, AuthorMetrics.xirr_1yr
+            ).all()
             return {
-                'data': [{
-                    'id': m.id,
-                    'username': m.username,
-                    'xirr5yr': m.xirr_5yr,
-                    'xirr3yr': m.xirr_3yr,
-                    'xirr1yr': m.xirr_1yr,
-                    'totalPicks': m.total_picks,
-                    'winRate': m.win_rate,
-                    'bestPickTicker': m.best_pick_ticker,
-                    'bestPickReturn': m.best_pick_return,
-                    'calculatedAt': m.calculated_at.isoformat() if m.calculated_at else None,
-                    'rank': offset + i + 1
-                } for i, m in enumerate(metrics)],
-                'total': total,
-                'limit': limit,
-                'offset': offset
+                r.username: {'xirr_5yr': r.xirr_5yr, 'xirr_3yr': r.xirr_3yr, 'xirr_1yr': r.xirr_1yr}
+                for r in rows
             }
 
-    def search_authors(self, search_term, limit=20):
-        """Search authors by username prefix (case-insensitive)"""
-        search_lower = search_term.lower().strip()
+    def get_authors_needing_metrics(self, windows=(5, 3, 1)):
+        """
+        Get authors whose metrics are missing or out of date.
+
+        An author is stale if, since their metrics were calculated, they got a
+        new or changed idea, one of their tickers changed price, or one of
+        their ideas aged out of a 1/3/5-year window.
+        """
+        now = datetime.utcnow()
+        calculated_at = AuthorMetrics.calculated_at
 
         with self.session_scope() as session:
-            metrics = session.query(AuthorMetrics).filter(
-                AuthorMetrics.username_lower.like(f'{search_lower}%')
+            # Authors that have never had metrics calculated
+            missing = session.query(Author.id).outerjoin(
+                AuthorMetrics, AuthorMetrics.author_id == Author.id
+            ).filter(AuthorMetrics.id.is_(None))
+            author_ids = {r[0] for r in missing}
+
+            # New ideas, or ideas whose price_at_rec was filled in
+            changed_ideas = session.query(Idea.author_id).join(
+                AuthorMetrics, AuthorMetrics.author_id == Idea.author_id
+            ).filter(
+                func.coalesce(Idea.updated_at, Idea.scraped_at) > calculated_at
+            ).distinct()
+            author_ids.update(r[0] for r in changed_ideas)
+
+            # Tickers whose current price changed
+            repriced = session.query(Idea.author_id).join(
+                AuthorMetrics, AuthorMetrics.author_id == Idea.author_id
+            ).join(
+                Price, Price.ticker_id == Idea.ticker_id
+            ).filter(
+                func.coalesce(Price.price_changed_at, Price.last_updated) > calculated_at
+            ).distinct()
+            author_ids.update(r[0] for r in repriced)
+
+            # Ideas that crossed a window boundary: posted_date + window is
+            # between calculated_at and now. Only the oldest calculated_at is
+            # needed to bound the scan; the per-author check is done here.
+            oldest_calculated = session.query(func.min(calculated_at)).scalar()
+            if oldest_calculated:
+                for years in windows:
+                    span = timedelta(days=years * 365)
+                    crossed = session.query(Idea.author_id, Idea.posted_date, calculated_at).join(
+                        AuthorMetrics, AuthorMetrics.author_id == Idea.author_id
+                    ).filter(
+                        Idea.posted_date >= oldest_calculated - span,
+                        Idea.posted_date < now - span
+                    )
+                    author_ids.update(
+                        author_id for author_id, posted_date, calc in crossed
+                        if calc is None or posted_date >= calc - span
+                    )
+
+            author_ids = sorted(author_ids)
+            authors = []
+            for start in range(0, len(author_ids), IN_CHUNK):
+                chunk = author_ids[start:start + IN_CHUNK]
+                authors.extend(
+                    session.query(Author.id, Author.username).filter(Author.id.in_(chunk))
+                )
+
+            return [{'id': a.id, 'username': a.username} for a in authors]
+
+    def get_leaderboard(self, sort_by='xirr_5yr', limit=50, offset=0, cursor=None,
+                        use_snapshot=True):
+        """
+        Get leaderboard data sorted by XIRR.
+
+        Pages are fetched by offset, or by keyset on (sort field, id) when
+        `cursor` (a previous page's nextCursor) is given, which stays fast
+        however deep the page is. Served from the memory-mapped snapshot when
+        one has been published, otherwise from SQLite.
+        """
+        sort_field = getattr(AuthorMetrics, sort_by, AuthorMetrics.xirr_5yr)
+
+        if use_snapshot:
+            result = self._leaderboard_from_snapshot(sort_field, limit, offset, cursor)
+            if result is not None:
+                return result
+
+        with self.session_scope() as session:
+            return self._query_leaderboard(session, sort_field, limit, offset, cursor)
+
+    @staticmethod
+    def _metrics_version(session):
+        """
+        Time of the latest metrics write, from any process (an index lookup).
+        Caches derived from metrics are valid only while it is unchanged.
+        """
+        return session.query(func.max(AuthorMetrics.calculated_at)).scalar()
+
+    def _leaderboard_from_snapshot(self, sort_field, limit, offset, cursor):
+        """Snapshot path of get_leaderboard, None if no snapshot covers sort_field"""
+        snapshot = self._get_snapshot() if sort_field.key in SORT_KEYS else None
+        if snapshot is None:
+            return None
+
+        after = self._decode_cursor(cursor, sort_field.key) if cursor else None
+        return snapshot.get_leaderboard(
+            sort_field.key, limit, offset, after, encode_cursor=self._encode_cursor
+        )
+
+    def _query_leaderboard(self, session, sort_field, limit, offset, cursor):
+        """SQL path of get_leaderboard, run in the caller's session"""
+        query = session.query(AuthorMetrics).filter(
+            sort_field.isnot(None)
+        ).order_by(desc(sort_field), desc(AuthorMetrics.id))
+
+        version = self._metrics_version(session)
+        cached = self._leaderboard_totals.get(sort_field.key)
+        if cached and cached[0] == version:
+            total = cached[1]
+        else:
+            total = session.query(func.count(AuthorMetrics.id)).filter(
+                sort_field.isnot(None)
+            ).scalar()
+            self._leaderboard_totals[sort_field.key] = (version, total)
+
+        rank_field = getattr(AuthorMetrics, RANK_COLUMNS.get(sort_field.key, ''), None)
+
+        if cursor:
+            after = self._decode_cursor(cursor, sort_field.key)
+            start = after['rank']
+            metrics = query.filter(
+                (sort_field < after['value']) |
+                ((sort_field == after['value']) & (AuthorMetrics.id < after['id']))
             ).limit(limit).all()
+        else:
+            start = offset
+            metrics = None
+            if rank_field is not None:
+                # Rank-range lookup on the materialized ranks
+                metrics = session.query(AuthorMetrics).filter(
+                    rank_field > offset, rank_field <= offset + limit
+                ).order_by(rank_field).all()
+                # Ranks not built yet (e.g. a freshly migrated database)
+                if len(metrics) < min(limit, max(total - offset, 0)):
+                    metrics = None
+            if metrics is None:
+                metrics = query.offset(offset).limit(limit).all()
+
+        next_cursor = None
+        if metrics and start + len(metrics) < total:
+            last = metrics[-1]
+            next_cursor = self._encode_cursor(
+                sort_field.key, getattr(last, sort_field.key), last.id, start + len(metrics)
+            )
 
-            return [{
+        return {
+            'data': [{
                 'id': m.id,
                 'username': m.username,
                 'xirr5yr': m.xirr_5yr,
                 'xirr3yr': m.xirr_3yr,
                 'xirr1yr': m.xirr_1yr,
                 'totalPicks': m.total_picks,
+                'winRate': m.win_rate,
                 'bestPickTicker': m.best_pick_ticker,
-                'bestPickReturn': m.best_pick_return
-            } for m in metrics]
+                'bestPickReturn': m.best_pick_return,
+                'calculatedAt': m.calculated_at.isoformat() if m.calculated_at else None,
+                'rank': start + i + 1
+            } for i, m in enumerate(metrics)],
+            'total': total,
+            'limit': limit,
+            'offset': start,
+            'nextCursor': next_cursor
+        }
+
+    @staticmethod
+    def _encode_cursor(sort_key, value, last_id, rank):
+        """Opaque keyset cursor: the last row's sort value, id and rank"""
+        payload = json.dumps({'s': sort_key, 'v': value, 'i': last_id, 'r': rank})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_cursor(cursor, sort_key):
+        """Decode a keyset cursor, raising ValueError if it's malformed or for another sort"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            after = {'value': float(payload['v']), 'id': int(payload['i']), 'rank': int(payload['r'])}
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('Invalid cursor')
+
+        if payload.get('s') != sort_key:
+            raise ValueError('Cursor does not match sort field')
+        return after
+
+    def search_authors(self, search_term, limit=20):
+        """
+        Search authors by username (case-insensitive).
+
+        Matches prefixes, substrings and near-misses (typos), ranked in that
+        order and then by 5-year XIRR. Served from an in-memory trigram index.
+
+        Returns:
+            List of author dicts, each with a 'match' of prefix/substring/fuzzy
+        """
+        return self._get_search_index().search(search_term, limit=limit)
+
+    def _get_search_index(self):
+        """Return the author search index, rebuilding it if metrics changed"""
+        with self.session_scope() as session:
+            version = self._metrics_version(session)
+            index = self._current_search_index(version)
+            if index is not None:
+                return index
+
+            with self._search_index_lock:
+                index = self._current_search_index(version)
+                if index is not None:
+                    return index
+                return self._set_search_index(version, self._query_search_rows(session))
+
+    def _current_search_index(self, version):
+        """The search index if it was built at this metrics version, else None"""
+        cached = self._search_index
+        if cached and cached[0] == version:
+            return cached[1]
+        return None
+
+    def _set_search_index(self, version, rows):
+        """Build and cache the search index from rows read at version"""
+        index = AuthorSearchIndex(rows)
+        self._search_index = (version, index)
+        return index
+
+    def _query_search_rows(self, session):
+        """Every author with metrics, in search result shape"""
+        metrics = session.query(
+            AuthorMetrics.id, AuthorMetrics.username, AuthorMetrics.xirr_5yr,
+            AuthorMetrics.xirr_3yr, AuthorMetrics.xirr_1yr, AuthorMetrics.total_picks,
+            AuthorMetrics.best_pick_ticker, AuthorMetrics.best_pick_return,
+            AuthorMetrics.rank_5yr, AuthorMetrics.rank_3yr, AuthorMetrics.rank_1yr
+        ).all()
+
+        return [{
+            'id': m.id,
+            'username': m.username,
+            'xirr5yr': m.xirr_5yr,
+            'xirr3yr': m.xirr_3yr,
+            'xirr1yr': m.xirr_1yr,
+            'totalPicks': m.total_picks,
+            'bestPickTicker': m.best_pick_ticker,
+            'bestPickReturn': m.best_pick_return,
+            'rank5yr': m.rank_5yr,
+            'rank3yr': m.rank_3yr,
+            'rank1yr': m.rank_1yr
+        } for m in metrics]
 
     def get_author_with_ideas(self, username):
         """Get author metrics with their ideas"""
         with self.session_scope() as session:
-            author = session.query(Author).filter_by(username=username).first()
-            if not author:
-                return None
+            return self._query_author_with_ideas(session, username)
+
+    def _query_author_with_ideas(self, session, username):
+        """get_author_with_ideas, run in the caller's session"""
+        author = session.query(Author).filter_by(username=username).first()
+        if not author:
+            return None
+
+        metrics = session.query(AuthorMetrics).filter_by(author_id=author.id).first()
+
+        # Returns are persisted on the idea; the join only adds the display price
+        ideas = session.query(
+            Idea.id, Ticker.symbol, Idea.company_name, Idea.posted_date, Idea.position_type,
+            Idea.price_at_rec, Idea.current_return, Price.current_price
+        ).join(
+            Ticker, Ticker.id == Idea.ticker_id
+        ).outerjoin(
+            Price, Price.ticker_id == Idea.ticker_id
+        ).filter(
+            Idea.author_id == author.id
+        ).order_by(desc(Idea.posted_date)).all()
+
+        ideas_with_returns = [{
+            'id': idea.id,
+            'ticker': idea.symbol,
+            'companyName': idea.company_name,
+            'postedDate': idea.posted_date.isoformat() if idea.posted_date else None,
+            'positionType': idea.position_type,
+            'priceAtRec': idea.price_at_rec,
+            'currentPrice': idea.current_price,
+            'return': round(idea.current_return) if idea.current_return else None
+        } for idea in ideas]
+
+        result = {
+            'username': author.username,
+            'totalPicks': len(ideas),
+            'ideas': ideas_with_returns
+        }
+
+        if metrics:
+            result.update({
+                'xirr5yr': metrics.xirr_5yr,
+                'xirr3yr': metrics.xirr_3yr,
+                'xirr1yr': metrics.xirr_1yr,
+                'winRate': metrics.win_rate,
+                'bestPickTicker': metrics.best_pick_ticker,
+                'bestPickReturn': metrics.best_pick_return,
+                'rank5yr': metrics.rank_5yr,
+                'rank3yr': metrics.rank_3yr,
+                'rank1yr': metrics.rank_1yr
+            })
+
+        return result
+
+    # ==================== Export ====================
+
+    def _export_source(self, table):
+        """
+        Columns and watermark of an exportable table.
+
+        Every table's watermark is its rows' last write time, so an
+        incremental export picks up new and rewritten rows. Ideas are
+        rewritten when their price at recommendation is filled in and
+        whenever their return moves with their ticker's price; their
+        updated_at is indexed together with id, so each chunk is a range
+        scan rather than a sort of the whole table.
+
+        Returns:
+            (columns, watermark expression, joins)
+
+        Raises:
+            ValueError: If table isn't one of EXPORT_TABLES
+        """
+        if table == 'ideas':
+            columns = [
+                Idea.id, Idea.author_id, Author.username, Ticker.symbol.label('ticker'),
+                Idea.company_name,
+                Idea.posted_date, Idea.position_type, Idea.price_at_rec, Idea.current_return,
+                Idea.vic_idea_id, Idea.idea_url, Idea.scraped_at, Idea.updated_at
+            ]
+            joins = [(Author, Author.id == Idea.author_id), (Ticker, Ticker.id == Idea.ticker_id)]
+            return columns, Idea.updated_at, joins
+        if table == 'prices':
+            columns = [
+                Price.id, Ticker.symbol.label('ticker'), Price.current_price, Price.last_updated,
+                Price.price_changed_at, Price.fetch_failed
+            ]
+            return (columns, func.coalesce(Price.last_updated, EXPORT_EPOCH),
+                    [(Ticker, Ticker.id == Price.ticker_id)])
+        if table == 'author_metrics':
+            columns = [
+                AuthorMetrics.id, AuthorMetrics.author_id, AuthorMetrics.username,
+                AuthorMetrics.xirr_5yr, AuthorMetrics.xirr_3yr, AuthorMetrics.xirr_1yr,
+                AuthorMetrics.total_picks, AuthorMetrics.win_rate, AuthorMetrics.best_pick_ticker,
+                AuthorMetrics.best_pick_return, AuthorMetrics.rank_5yr, AuthorMetrics.rank_3yr,
+                AuthorMetrics.rank_1yr, AuthorMetrics.calculated_at
+            ]
+            return columns, func.coalesce(AuthorMetrics.calculated_at, EXPORT_EPOCH), []
+        raise ValueError(f'Unknown export table: {table}')
+
+    def get_export_watermark(self, table):
+        """
+        The watermark of the last row in a table written at least EXPORT_LAG ago.
+
+        Exporting up to it (rather than to whatever is there when the last
+        chunk is read) keeps rows written mid-export for the next increment.
+        Holding back recent writes keeps those of transactions that were
+        still open, which commit after the export with an earlier write
+        time, from ending up behind the watermark.
+
+        Returns:
+            Opaque watermark string, or None if no row is old enough
+        """
+        columns, watermark, _ = self._export_source(table)
+        row_id = columns[0]
+        with self.session_scope() as session:
+            last = session.query(watermark, row_id).filter(
+                watermark <= datetime.utcnow() - EXPORT_LAG
+            ).order_by(desc(watermark), desc(row_id)).first()
 
-            metrics = session.query(AuthorMetrics).filter_by(author_id=author.id).first()
-            ideas = session.query(Idea).filter_by(author_id=author.id).order_by(
-                desc(Idea.posted_date)
-            ).all()
+        return self._encode_watermark(table, *last) if last else None
 
-            # Get prices for ideas
-            tickers = list(set(i.ticker for i in ideas))
-            prices = session.query(Price).filter(Price.ticker.in_(tickers)).all()
-            price_map = {p.ticker: p.current_price for p in prices}
-
-            ideas_with_returns = []
-            for idea in ideas:
-                current_price = price_map.get(idea.ticker)
-                return_pct = None
-
-                if current_price and idea.price_at_rec and idea.price_at_rec > 0:
-                    if idea.position_type == 'long':
-                        return_pct = ((current_price - idea.price_at_rec) / idea.price_at_rec) * 100
-                    else:
-                        return_pct = ((idea.price_at_rec - current_price) / idea.price_at_rec) * 100
-
-                ideas_with_returns.append({
-                    'id': idea.id,
-                    'ticker': idea.ticker,
-                    'companyName': idea.company_name,
-                    'postedDate': idea.posted_date.isoformat() if idea.posted_date else None,
-                    'positionType': idea.position_type,
-                    'priceAtRec': idea.price_at_rec,
-                    'currentPrice': current_price,
-                    'return': round(return_pct) if return_pct else None
-                })
+    def export_rows(self, table, after=None, until=None, limit=EXPORT_CHUNK):
+        """
+        Read one chunk of a table export, in watermark order.
 
-            result = {
-                'username': author.username,
-                'totalPicks': len(ideas),
-                'ideas': ideas_with_returns
-            }
+        Args:
+            table: One of EXPORT_TABLES
+            after: Watermark to start after (None = from the first row)
+            until: Watermark to stop at, inclusive (None = no bound)
+            limit: Max rows in the chunk
 
-            if metrics:
-                result.update({
-                    'xirr5yr': metrics.xirr_5yr,
-                    'xirr3yr': metrics.xirr_3yr,
-                    'xirr1yr': metrics.xirr_1yr,
-                    'winRate': metrics.win_rate,
-                    'bestPickTicker': metrics.best_pick_ticker,
-                    'bestPickReturn': metrics.best_pick_return
-                })
+        Returns:
+            (column names, list of row tuples, watermark of the last row);
+            the watermark is `after` when no rows are left
 
-            return result
+        Raises:
+            ValueError: If the table is unknown or a watermark is malformed
+        """
+        columns, watermark, joins = self._export_source(table)
+        row_id = columns[0]
+
+        with self.session_scope() as session:
+            query = session.query(*columns, watermark)
+            for join in joins:
+                query = query.join(*join)
+            if after:
+                value, last_id = self._decode_watermark(after, table)
+                # The redundant >= bounds the index range scan
+                query = query.filter(
+                    watermark >= value, (watermark > value) | (row_id > last_id)
+                )
+            if until:
+                value, last_id = self._decode_watermark(until, table)
+                query = query.filter(
+                    watermark <= value, (watermark < value) | (row_id <= last_id)
+                )
+            rows = query.order_by(watermark, row_id).limit(limit).all()
+
+        last = after
+        if rows:
+            last = self._encode_watermark(table, rows[-1][-1], rows[-1][0])
+        return [c.key for c in columns], [tuple(r)[:-1] for r in rows], last
+
+    @staticmethod
+    def _encode_watermark(table, value, row_id):
+        """Opaque export watermark: the table, last row's write time and id"""
+        payload = json.dumps({'t': table, 'v': value.isoformat(), 'i': row_id})
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def _decode_watermark(watermark, table):
+        """Decode an export watermark, raising ValueError if it's malformed or for another table"""
+        try:
+            padded = watermark + '=' * (-len(watermark) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            value = datetime.fromisoformat(payload['v'])
+            row_id = int(payload['i'])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('Invalid watermark')
+
+        if payload.get('t') != table:
+            raise ValueError('Watermark is for another table')
+        return value, row_id
 
     # ==================== Cookie Operations ====================
 
@@ -412,15 +1833,12 @@ class Database:
     def get_scrape_status(self):
         """Get the current scraping status"""
         with self.session_scope() as session:
-            # Get latest log entry
+            # Latest log entry, read off the started_at index
             latest = session.query(ScrapeLog).order_by(
-                desc(ScrapeLog.started_at)
+                desc(ScrapeLog.started_at), desc(ScrapeLog.id)
             ).first()
 
-            # Get counts
-            authors_count = session.query(Author).count()
-            ideas_count = session.query(Idea).count()
-            metrics_count = session.query(AuthorMetrics).count()
+            counters = self._get_counters(session)
 
             return {
                 'latestJob': {
@@ -432,31 +1850,166 @@ class Database:
                     'completedAt': latest.completed_at.isoformat() if latest.completed_at else None
                 } if latest else None,
                 'counts': {
-                    'authors': authors_count,
-                    'ideas': ideas_count,
-                    'authorsWithMetrics': metrics_count
+                    'authors': counters.authors,
+                    'ideas': counters.ideas,
+                    'authorsWithMetrics': counters.authors_with_metrics
                 }
             }
 
+    def compact_scrape_log(self, raw_days=None, summary_days=None):
+        """
+        Apply the scrape log retention policy.
+
+        ScrapeLog rows from days at least raw_days old are folded into one
+        ScrapeLogDaily row per (day, job_type, status) and deleted, and
+        summaries older than summary_days are deleted. Only whole UTC days
+        are compacted, so running it repeatedly is cheap and idempotent.
+
+        Args:
+            raw_days: Days of individual rows to keep (defaults to SCRAPE_LOG_RAW_DAYS)
+            summary_days: Days of daily summaries to keep, 0 = forever
+                          (defaults to SCRAPE_LOG_SUMMARY_DAYS)
+
+        Returns:
+            Dict with the number of log rows 'compacted', summary rows
+            'summarized' into and summary rows 'expired'
+        """
+        raw_days = SCRAPE_LOG_RAW_DAYS if raw_days is None else raw_days
+        summary_days = SCRAPE_LOG_SUMMARY_DAYS if summary_days is None else summary_days
+        today = datetime.utcnow().date()
+        cutoff = datetime.combine(today - timedelta(days=raw_days), time.min)
+
+        with self.session_scope() as session:
+            summaries = self._summarize_scrape_log(session, ScrapeLog.started_at < cutoff)
+            if summaries:
+                stmt = self._insert(ScrapeLogDaily)
+                new = stmt.excluded
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=[ScrapeLogDaily.day, ScrapeLogDaily.job_type,
+                                    ScrapeLogDaily.status],
+                    set_={
+                        'runs': ScrapeLogDaily.runs + new.runs,
+                        'items_processed': ScrapeLogDaily.items_processed + new.items_processed,
+                        'first_started_at': case(
+                            (new.first_started_at < ScrapeLogDaily.first_started_at,
+                             new.first_started_at),
+                            else_=func.coalesce(ScrapeLogDaily.first_started_at,
+                                                new.first_started_at)
+                        ),
+                        'last_completed_at': case(
+                            (new.last_completed_at > ScrapeLogDaily.last_completed_at,
+                             new.last_completed_at),
+                            else_=func.coalesce(ScrapeLogDaily.last_completed_at,
+                                                new.last_completed_at)
+                        ),
+                        'last_error_message': func.coalesce(new.last_error_message,
+                                                            ScrapeLogDaily.last_error_message)
+                    }
+                ), summaries)
+
+            compacted = session.query(ScrapeLog).filter(
+                ScrapeLog.started_at < cutoff
+            ).delete(synchronize_session=False)
+
+            expired = 0
+            if summary_days:
+                expired = session.query(ScrapeLogDaily).filter(
+                    ScrapeLogDaily.day < today - timedelta(days=summary_days)
+                ).delete(synchronize_session=False)
+
+        return {'compacted': compacted, 'summarized': len(summaries), 'expired': expired}
+
+    def _summarize_scrape_log(self, session, *criteria):
+        """ScrapeLog rows matching criteria, aggregated into ScrapeLogDaily dicts"""
+        day = func.date(ScrapeLog.started_at)
+        groups = session.query(
+            day, ScrapeLog.job_type, ScrapeLog.status,
+            func.count(ScrapeLog.id),
+            func.coalesce(func.sum(ScrapeLog.items_processed), 0),
+            func.min(ScrapeLog.started_at),
+            func.max(ScrapeLog.completed_at)
+        ).filter(*criteria).group_by(day, ScrapeLog.job_type, ScrapeLog.status)
+
+        summaries = {}
+        for group_day, job_type, status, runs, items, first_started, last_completed in groups:
+            # SQLite's date() returns text
+            if not isinstance(group_day, date):
+                group_day = date.fromisoformat(group_day)
+            summaries[group_day, job_type, status] = {
+                'day': group_day,
+                'job_type': job_type,
+                'status': status,
+                'runs': runs,
+                'items_processed': items,
+                'first_started_at': first_started,
+                'last_completed_at': last_completed,
+                'last_error_message': None
+            }
+
+        # Latest error per group; failures are a small share of the log
+        errors = session.query(
+            day, ScrapeLog.job_type, ScrapeLog.status, ScrapeLog.error_message
+        ).filter(
+            *criteria, ScrapeLog.error_message.isnot(None)
+        ).order_by(ScrapeLog.started_at, ScrapeLog.id)
+        for group_day, job_type, status, message in errors:
+            if not isinstance(group_day, date):
+                group_day = date.fromisoformat(group_day)
+            summaries[group_day, job_type, status]['last_error_message'] = message
+
+        return list(summaries.values())
+
+    def get_scrape_history(self, days=30):
+        """
+        Get daily scrape activity per job type, from summaries and recent log rows.
+
+        Args:
+            days: Number of UTC days to include, ending today
+
+        Returns:
+            List of {'day', 'jobType', 'status', 'runs', 'itemsProcessed',
+            'lastError'} dicts, newest day first
+        """
+        start = datetime.utcnow().date() - timedelta(days=max(days, 1) - 1)
+
+        with self.session_scope() as session:
+            rows = self._summarize_scrape_log(
+                session, ScrapeLog.started_at >= datetime.combine(start, time.min)
+            )
+            merged = {(r['day'], r['job_type'], r['status']): r for r in rows}
+
+            for summary in session.query(ScrapeLogDaily).filter(ScrapeLogDaily.day >= start):
+                key = (summary.day, summary.job_type, summary.status)
+                row = merged.setdefault(key, {
+                    'day': summary.day, 'job_type': summary.job_type, 'status': summary.status,
+                    'runs': 0, 'items_processed': 0, 'last_error_message': None
+                })
+                row['runs'] += summary.runs
+                row['items_processed'] += summary.items_processed
+                row['last_error_message'] = row['last_error_message'] or summary.last_error_message
+
+        return [{
+            'day': r['day'].isoformat(),
+            'jobType': r['job_type'],
+            'status': r['status'],
+            'runs': r['runs'],
+            'itemsProcessed': r['items_processed'],
+            'lastError': r['last_error_message']
+        } for r in sorted(merged.values(), key=lambda r: (r['day'], r['job_type'], r['status']),
+                          reverse=True)]
+
     # ==================== Stats ====================
 
     def get_aggregate_stats(self):
         """Get aggregate statistics"""
         with self.session_scope() as session:
-            authors_count = session.query(Author).count()
-            ideas_count = session.query(Idea).count()
-            metrics_count = session.query(AuthorMetrics).count()
-
-            # Get latest update time
-            latest_metrics = session.query(AuthorMetrics).order_by(
-                desc(AuthorMetrics.calculated_at)
-            ).first()
+            counters = self._get_counters(session)
 
             return {
-                'totalAuthors': authors_count,
-                'totalIdeas': ideas_count,
-                'authorsWithMetrics': metrics_count,
-                'lastUpdated': latest_metrics.calculated_at.isoformat() if latest_metrics else None
+                'totalAuthors': counters.authors,
+                'totalIdeas': counters.ideas,
+                'authorsWithMetrics': counters.authors_with_metrics,
+                'lastUpdated': counters.last_metrics_at.isoformat() if counters.last_metrics_at else None
             }
 
 
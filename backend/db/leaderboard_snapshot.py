@@ -0,0 +1,215 @@
+"""
+Immutable, memory-mapped leaderboard snapshot
+
+A snapshot is one binary file written after metrics change:
+
+    header      fixed-size struct (HEADER): magic, version, row and string counts
+    records     n_rows x RECORD_DTYPE, fixed-width author metrics
+    orders      one int32 array per SORT_KEYS entry: record positions sorted by
+                (sort value desc, id desc), non-null values only
+    strings     UTF-8 usernames, addressed by (name_offset, name_len)
+
+Readers mmap the file and slice it with NumPy views, so serving a page never
+touches SQLite and every process serving the API shares one page-cached copy.
+Snapshots are replaced atomically (write + rename) and never modified in place.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+MAGIC = b'VICLBSN1'
+FORMAT_VERSION = 1
+
+# Sort keys with a precomputed order, in file order
+SORT_KEYS = ('xirr_5yr', 'xirr_3yr', 'xirr_1yr')
+
+# magic, version, n_rows, rows per sort key, strings size
+HEADER = struct.Struct('<8sII' + 'I' * len(SORT_KEYS) + 'Q')
+
+RECORD_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('xirr_5yr', '<f8'),           # NaN = None
+    ('xirr_3yr', '<f8'),
+    ('xirr_1yr', '<f8'),
+    ('win_rate', '<f8'),
+    ('best_pick_return', '<f8'),
+    ('calculated_at', '<i8'),      # Microseconds since the epoch, NO_TIMESTAMP = None
+    ('total_picks', '<i4'),
+    ('name_len', '<u4'),
+    ('name_offset', '<u8'),
+    ('best_pick_ticker', 'S20'),   # Empty = None
+])
+
+EPOCH = datetime(1970, 1, 1)
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def _float_or_none(value) -> Optional[float]:
+    return None if value != value else float(value)  # NaN check
+
+
+def write_snapshot(path: str, rows: List[dict]):
+    """
+    Write a snapshot of leaderboard rows to path, replacing any existing one.
+
+    Args:
+        path: Snapshot file path
+        rows: Dicts with the AuthorMetrics fields served by get_leaderboard
+              (id, username, xirr_*, total_picks, win_rate, best_pick_ticker,
+              best_pick_return, calculated_at)
+    """
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    names = [r['username'].encode() for r in rows]
+    lengths = np.array([len(n) for n in names], dtype=np.uint64)
+
+    records['id'] = [r['id'] for r in rows]
+    for field in ('xirr_5yr', 'xirr_3yr', 'xirr_1yr', 'win_rate', 'best_pick_return'):
+        records[field] = [np.nan if r[field] is None else r[field] for r in rows]
+    records['calculated_at'] = [
+        NO_TIMESTAMP if r['calculated_at'] is None
+        else (r['calculated_at'] - EPOCH) // timedelta(microseconds=1)
+        for r in rows
+    ]
+    records['total_picks'] = [r['total_picks'] or 0 for r in rows]
+    records['best_pick_ticker'] = [(r['best_pick_ticker'] or '').encode() for r in rows]
+    records['name_len'] = lengths
+    records['name_offset'] = np.concatenate(([0], np.cumsum(lengths)[:-1])) if rows else []
+
+    orders = []
+    for key in SORT_KEYS:
+        present = np.flatnonzero(~np.isnan(records[key]))
+        # lexsort sorts ascending on the last key first
+        order = present[np.lexsort((-records['id'][present], -records[key][present]))]
+        orders.append(order.astype('<i4'))
+
+    strings = b''.join(names)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(rows), *[len(o) for o in orders], len(strings))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.leaderboard-', dir=directory)
+    try:
+        # mkstemp creates the file 0600; every server process reads it
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(records.tobytes())
+            for order in orders:
+                f.write(order.tobytes())
+            f.write(strings)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class LeaderboardSnapshot:
+    """Read-only view of a snapshot file, serving get_leaderboard pages"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Snapshot file written by write_snapshot
+
+        Raises:
+            ValueError: If the file isn't a snapshot of this format version
+        """
+        with open(path, 'rb') as f:
+            self.identity = self.file_identity(os.fstat(f.fileno()))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError('Truncated leaderboard snapshot')
+        magic, version, n_rows, *counts, strings_size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Not a leaderboard snapshot of this version')
+
+        offset = HEADER.size
+        self.records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=n_rows, offset=offset)
+        offset += self.records.nbytes
+
+        self.orders = {}
+        for key, count in zip(SORT_KEYS, counts):
+            self.orders[key] = np.frombuffer(self._mmap, dtype='<i4', count=count, offset=offset)
+            offset += self.orders[key].nbytes
+
+        self._strings_offset = offset
+        if offset + strings_size != len(self._mmap):
+            raise ValueError('Truncated leaderboard snapshot')
+
+    @staticmethod
+    def file_identity(stat_result) -> tuple:
+        """What changes when a snapshot file is replaced"""
+        return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+    def _username(self, record) -> str:
+        start = self._strings_offset + int(record['name_offset'])
+        return self._mmap[start:start + int(record['name_len'])].decode()
+
+    def _start_after(self, order: np.ndarray, sort_key: str, value: float, last_id: int) -> int:
+        """Position of the first row after (value, last_id) in an order"""
+        values = self.records[sort_key][order]
+        # Values are descending, so search their negation
+        position = int(np.searchsorted(-values, -value, side='left'))
+        ids = self.records['id']
+        while position < len(order) and values[position] == value and ids[order[position]] >= last_id:
+            position += 1
+        return position
+
+    def get_leaderboard(self, sort_key: str, limit: int, offset: int = 0,
+                        after: Optional[dict] = None, encode_cursor=None) -> dict:
+        """
+        Get a leaderboard page, in the same shape as Database.get_leaderboard.
+
+        Args:
+            sort_key: One of SORT_KEYS
+            limit: Number of rows
+            offset: Rows to skip (ignored when after is given)
+            after: Decoded keyset cursor ({'value', 'id', 'rank'}) to continue from
+            encode_cursor: Callable(sort_key, value, last_id, rank) for nextCursor
+        """
+        order = self.orders[sort_key]
+        total = len(order)
+        start = offset if after is None else self._start_after(
+            order, sort_key, after['value'], after['id']
+        )
+        page = self.records[order[start:start + max(limit, 0)]]
+
+        data = []
+        for i, r in enumerate(page):
+            calculated_at = int(r['calculated_at'])
+            data.append({
+                'id': int(r['id']),
+                'username': self._username(r),
+                'xirr5yr': _float_or_none(r['xirr_5yr']),
+                'xirr3yr': _float_or_none(r['xirr_3yr']),
+                'xirr1yr': _float_or_none(r['xirr_1yr']),
+                'totalPicks': int(r['total_picks']),
+                'winRate': _float_or_none(r['win_rate']),
+                'bestPickTicker': r['best_pick_ticker'].decode() or None,
+                'bestPickReturn': _float_or_none(r['best_pick_return']),
+                'calculatedAt': None if calculated_at == NO_TIMESTAMP else (
+                    EPOCH + timedelta(microseconds=calculated_at)
+                ).isoformat(),
+                'rank': start + i + 1
+            })
+
+        next_cursor = None
+        if data and start + len(data) < total and encode_cursor:
+            last = page[-1]
+            next_cursor = encode_cursor(
+                sort_key, float(last[sort_key]), int(last['id']), start + len(data)
+            )
+
+        return {
+            'data': data,
+            'total': total,
+            'limit': limit,
+            'offset': start,
+            'nextCursor': next_cursor
+        }
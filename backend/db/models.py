@@ -2,7 +2,9 @@
 SQLAlchemy database models for VIC Leaderboard
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -30,6 +32,40 @@ class Author(Base):
         return f"<Author(username='{self.username}')>"
 
 
+class Ticker(Base):
+    """Ticker symbol, referenced by integer id from ideas and prices"""
+    __tablename__ = 'tickers'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    symbol = Column(String(20), unique=True, nullable=False)  # As posted on VIC, upper-cased
+    yahoo_symbol = Column(String(20))  # Symbol to request from Yahoo Finance (None if unknown)
+    exchange = Column(String(10))  # Bloomberg-style exchange code, 'US' for plain symbols
+
+    # Span of days whose closes were fetched into daily_closes; every
+    # trading day between them is stored
+    closes_from = Column(Date)
+    closes_to = Column(Date)
+
+    def __repr__(self):
+        return f"<Ticker(symbol='{self.symbol}')>"
+
+
+class DailyClose(Base):
+    """Daily closing price of a ticker, fetched once from Yahoo Finance and kept"""
+    __tablename__ = 'daily_closes'
+
+    # Keyed (and on SQLite clustered) by ticker and day, so a ticker's
+    # history is one range scan and no separate index is needed
+    ticker_id = Column(Integer, ForeignKey('tickers.id'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    close = Column(Float, nullable=False)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    def __repr__(self):
+        return f"<DailyClose(ticker_id={self.ticker_id}, day={self.day}, close={self.close})>"
+
+
 class Idea(Base):
     """Stock recommendation/idea"""
     __tablename__ = 'ideas'
@@ -37,20 +73,32 @@ class Idea(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     author_id = Column(Integer, ForeignKey('authors.id'), nullable=False, index=True)
     vic_idea_id = Column(String(50), unique=True)  # VIC internal idea ID
-    ticker = Column(String(20), nullable=False, index=True)
+    ticker_id = Column(Integer, ForeignKey('tickers.id'), nullable=False, index=True)
     company_name = Column(String(200))
     posted_date = Column(DateTime, nullable=False, index=True)
     position_type = Column(String(10), default='long')  # 'long' or 'short'
     price_at_rec = Column(Float)  # Price at recommendation time
+    current_return = Column(Float)  # Percentage return at the ticker's current price, refreshed on price writes
     market_cap_at_rec = Column(Float)
     idea_url = Column(String(500))
     scraped_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     author = relationship('Author', back_populates='ideas')
+    ticker = relationship('Ticker')
+
+    __table_args__ = (
+        # Per-author idea listings, newest first
+        Index('ix_ideas_author_id_posted_date', 'author_id', 'posted_date'),
+        # Ideas still waiting for a price at recommendation
+        Index('ix_ideas_price_at_rec_posted_date', 'price_at_rec', 'posted_date'),
+        # Incremental exports, in write order
+        Index('ix_ideas_updated_at_id', 'updated_at', 'id'),
+    )
 
     def __repr__(self):
-        return f"<Idea(ticker='{self.ticker}', author_id={self.author_id})>"
+        return f"<Idea(ticker_id={self.ticker_id}, author_id={self.author_id})>"
 
 
 class Price(Base):
@@ -58,13 +106,17 @@ class Price(Base):
     __tablename__ = 'prices'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    ticker = Column(String(20), unique=True, nullable=False, index=True)
+    ticker_id = Column(Integer, ForeignKey('tickers.id'), unique=True, nullable=False)
     current_price = Column(Float)
     last_updated = Column(DateTime, default=datetime.utcnow)
+    price_changed_at = Column(DateTime, default=datetime.utcnow)  # Last time current_price changed value
     fetch_failed = Column(Boolean, default=False)  # True if ticker couldn't be fetched
 
+    # Relationships
+    ticker = relationship('Ticker')
+
     def __repr__(self):
-        return f"<Price(ticker='{self.ticker}', price={self.current_price})>"
+        return f"<Price(ticker_id={self.ticker_id}, price={self.current_price})>"
 
 
 class AuthorMetrics(Base):
@@ -76,10 +128,10 @@ class AuthorMetrics(Base):
     username = Column(String(100), index=True)  # Denormalized for quick access
     username_lower = Column(String(100), index=True)
 
-    # XIRR metrics (annualized returns)
-    xirr_5yr = Column(Float)
-    xirr_3yr = Column(Float)
-    xirr_1yr = Column(Float)
+    # XIRR metrics (annualized returns), indexed for leaderboard sorting
+    xirr_5yr = Column(Float, index=True)
+    xirr_3yr = Column(Float, index=True)
+    xirr_1yr = Column(Float, index=True)
 
     # Statistics
     total_picks = Column(Integer, default=0)
@@ -89,7 +141,12 @@ class AuthorMetrics(Base):
     best_pick_ticker = Column(String(20))
     best_pick_return = Column(Float)  # Percentage return
 
-    calculated_at = Column(DateTime, default=datetime.utcnow)
+    # Leaderboard position per sort key, rebuilt after every metrics write
+    rank_5yr = Column(Integer, index=True)
+    rank_3yr = Column(Integer, index=True)
+    rank_1yr = Column(Integer, index=True)
+
+    calculated_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     author = relationship('Author', back_populates='metrics')
@@ -98,23 +155,64 @@ class AuthorMetrics(Base):
         return f"<AuthorMetrics(username='{self.username}', xirr_5yr={self.xirr_5yr})>"
 
 
+class Counters(Base):
+    """Running totals kept in step with writes by Database (single row, id=1)"""
+    __tablename__ = 'counters'
+
+    id = Column(Integer, primary_key=True)
+    authors = Column(Integer, default=0, nullable=False)
+    ideas = Column(Integer, default=0, nullable=False)
+    authors_with_metrics = Column(Integer, default=0, nullable=False)
+    last_metrics_at = Column(DateTime)  # Latest AuthorMetrics.calculated_at
+
+    def __repr__(self):
+        return f"<Counters(authors={self.authors}, ideas={self.ideas})>"
+
+
 class ScrapeLog(Base):
     """Job execution history"""
     __tablename__ = 'scrape_log'
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    job_type = Column(String(50), nullable=False)  # 'ideas', 'author', 'prices', 'metrics'
+    job_type = Column(String(50), nullable=False, index=True)  # 'ideas', 'author', 'prices', 'metrics'
     author_username = Column(String(100))  # If applicable
     status = Column(String(20), nullable=False)  # 'success', 'failed', 'partial'
     items_processed = Column(Integer, default=0)
     error_message = Column(Text)
-    started_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, default=datetime.utcnow, index=True)
     completed_at = Column(DateTime)
 
+    __table_args__ = (
+        # Latest runs of one job type
+        Index('ix_scrape_log_job_type_started_at', 'job_type', 'started_at'),
+    )
+
     def __repr__(self):
         return f"<ScrapeLog(job_type='{self.job_type}', status='{self.status}')>"
 
 
+class ScrapeLogDaily(Base):
+    """Per-day, per-job-type summary of ScrapeLog rows compacted by Database.compact_scrape_log"""
+    __tablename__ = 'scrape_log_daily'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)  # UTC day of started_at
+    job_type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False)
+    runs = Column(Integer, default=0, nullable=False)  # ScrapeLog rows summarized
+    items_processed = Column(Integer, default=0, nullable=False)
+    first_started_at = Column(DateTime)
+    last_completed_at = Column(DateTime)
+    last_error_message = Column(Text)
+
+    __table_args__ = (
+        UniqueConstraint('day', 'job_type', 'status', name='uq_scrape_log_daily_day_job_status'),
+    )
+
+    def __repr__(self):
+        return f"<ScrapeLogDaily(day={self.day}, job_type='{self.job_type}', runs={self.runs})>"
+
+
 class CookieStore(Base):
     """Store for VIC session cookies"""
     __tablename__ = 'cookie_store'
@@ -0,0 +1,195 @@
+"""
+In-memory trigram index for author typeahead search
+"""
+
+from bisect import bisect_left
+from typing import List
+
+import numpy as np
+
+# Minimum trigram similarity (shared / union, as in pg_trgm) for a fuzzy match
+SIMILARITY_THRESHOLD = 0.25
+
+# Match tiers, best first
+PREFIX, SUBSTRING, FUZZY = 3, 2, 1
+MATCH_TYPES = {PREFIX: 'prefix', SUBSTRING: 'substring', FUZZY: 'fuzzy'}
+
+
+def _trigrams(text: str, padded: bool = True) -> set:
+    """Trigrams of text; padding marks word start/end like pg_trgm"""
+    if padded:
+        text = f'  {text} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class AuthorSearchIndex:
+    """
+    Substring and typo-tolerant username search over a fixed set of authors.
+
+    Built once from leaderboard rows and read-only afterwards, so it can be
+    shared between request threads. Prefixes are a bisect over sorted names;
+    substring and fuzzy lookups intersect or count NumPy posting arrays for
+    the term's trigrams, and only run when earlier tiers leave room.
+    """
+
+    def __init__(self, rows: List[dict]):
+        """
+        Args:
+            rows: Search result dicts, each with 'username' and 'xirr5yr'
+        """
+        self.rows = rows
+        self.names = [r['username'].lower() for r in rows]
+
+        xirr = np.array(
+            [np.nan if r.get('xirr5yr') is None else r['xirr5yr'] for r in rows], dtype=float
+        )
+        self._xirr = np.where(np.isnan(xirr), -np.inf, xirr)
+        self._lengths = np.array([len(name) for name in self.names], dtype=np.int64)
+
+        # Sorted names for prefix ranges (also the only path for 1-2 char terms)
+        order = sorted(range(len(rows)), key=self.names.__getitem__)
+        self._sorted = np.array(order, dtype=np.int64)
+        self._sorted_names = [self.names[i] for i in order]
+
+        # Posting arrays are ascending, which intersect1d relies on
+        postings = {}
+        trigram_counts = np.zeros(len(rows), dtype=np.int32)
+        for i, name in enumerate(self.names):
+            grams = _trigrams(name)
+            trigram_counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int64) for g, ids in postings.items()}
+        self._trigram_counts = trigram_counts
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _most_relevant(self, ids: np.ndarray, limit: int, term: str = None) -> np.ndarray:
+        """
+        Up to limit ids, shortest name first (so an exact match leads), then
+        where term starts in the name if given, then highest 5-year XIRR.
+        """
+        # Usernames are at most 100 characters, so length * 1024 + position
+        # orders by length, then position
+        closeness = self._lengths[ids] * 1024
+        if term is not None:
+            closeness += np.array([self.names[i].find(term) for i in ids], dtype=np.int64)
+
+        if len(ids) > limit:
+            # Keep the limit closest names, breaking ties at the cutoff by XIRR
+            cutoff = np.partition(closeness, limit - 1)[limit - 1]
+            closer = np.flatnonzero(closeness < cutoff)
+            tied = np.flatnonzero(closeness == cutoff)
+            room = limit - len(closer)
+            if len(tied) > room:
+                tied = tied[np.argpartition(-self._xirr[ids[tied]], room - 1)[:room]]
+            keep = np.concatenate([closer, tied])
+            ids, closeness = ids[keep], closeness[keep]
+
+        return ids[np.lexsort((-self._xirr[ids], closeness))]
+
+    def _prefix_matches(self, term: str) -> np.ndarray:
+        start = bisect_left(self._sorted_names, term)
+        end = bisect_left(self._sorted_names, term[:-1] + chr(ord(term[-1]) + 1), start)
+        return self._sorted[start:end]
+
+    def _substring_matches(self, term: str) -> np.ndarray:
+        """Names containing every inner trigram of term, verified as substrings"""
+        grams = sorted(_trigrams(term, padded=False), key=lambda g: len(self._postings.get(g, ())))
+        if grams[0] not in self._postings:
+            return np.array([], dtype=np.int64)
+
+        ids = self._postings[grams[0]]
+        for gram in grams[1:]:
+            ids = np.intersect1d(ids, self._postings[gram], assume_unique=True)
+            if not len(ids):
+                return ids
+
+        if len(term) > 3:
+            ids = np.array([i for i in ids if term in self.names[i]], dtype=np.int64)
+        return ids
+
+    def _transposition_matches(self, term: str) -> np.ndarray:
+        """Names starting with term after swapping one pair of adjacent letters"""
+        variants = {term[:i] + term[i + 1] + term[i] + term[i + 2:] for i in range(len(term) - 1)}
+        variants.discard(term)
+        if not variants:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate([self._prefix_matches(v) for v in variants]))
+
+    def _fuzzy_matches(self, term: str):
+        """(ids, similarity) of names sharing enough padded trigrams with term"""
+        grams = _trigrams(term)
+        lists = [self._postings[g] for g in grams if g in self._postings]
+        if not lists:
+            return np.array([], dtype=np.int64), np.array([])
+
+        # shared / union >= threshold implies shared >= threshold * len(grams)
+        min_shared = max(1, int(np.ceil(SIMILARITY_THRESHOLD * len(grams))))
+
+        postings = np.concatenate(lists)
+        if len(postings) * 8 < len(self.rows):
+            # Few postings: sorting them beats a pass over every author
+            ids, shared = np.unique(postings, return_counts=True)
+        else:
+            hits = np.bincount(postings, minlength=len(self.rows))
+            ids = np.flatnonzero(hits >= min_shared)
+            shared = hits[ids]
+        similarity = shared / (len(grams) + self._trigram_counts[ids] - shared)
+        keep = similarity >= SIMILARITY_THRESHOLD
+        return ids[keep], similarity[keep]
+
+    def search(self, term: str, limit: int = 20) -> List[dict]:
+        """
+        Find authors whose username matches term.
+
+        Prefix matches rank first, then substring matches, then fuzzy matches.
+        Within the prefix and substring tiers, names closest to the term rank
+        first: an exact match, then shorter names, then (for substrings) an
+        earlier match. Fuzzy matches are names that start with term once two
+        adjacent letters are swapped, then names ranked by trigram similarity.
+        Higher 5-year XIRR breaks ties.
+        Later tiers are only computed when earlier ones don't fill the limit.
+
+        Args:
+            term: Search text (case-insensitive)
+            limit: Max results
+
+        Returns:
+            List of row dicts, each with an added 'match' type
+        """
+        term = term.lower().strip()
+        if not term or not self.rows or limit <= 0:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(ids, match):
+            for i in ids:
+                i = int(i)
+                if i not in seen and len(results) < limit:
+                    seen.add(i)
+                    results.append({**self.rows[i], 'match': match})
+
+        prefix = self._prefix_matches(term)
+        add(self._most_relevant(prefix, limit), MATCH_TYPES[PREFIX])
+
+        # Trigram tiers need at least one full trigram
+        if len(results) < limit and len(term) >= 3:
+            substring = self._substring_matches(term)
+            substring = substring[~np.isin(substring, prefix)]
+            add(self._most_relevant(substring, limit, term), MATCH_TYPES[SUBSTRING])
+
+        if len(results) < limit and len(term) >= 3:
+            # Swapped letters are the commonest typo, but they break two or
+            # three trigrams, which sinks short names below the threshold
+            transposed = self._transposition_matches(term)
+            add(self._most_relevant(transposed, limit), MATCH_TYPES[FUZZY])
+
+            ids, similarity = self._fuzzy_matches(term)
+            order = np.lexsort((-self._xirr[ids], -similarity))
+            add(ids[order[:limit + len(seen)]], MATCH_TYPES[FUZZY])
+
+        return results
@@ -0,0 +1,50 @@
+"""
+Normalization of VIC ticker symbols into Yahoo Finance symbols
+
+VIC lists US stocks by their plain symbol (`AAPL`, `BRK.B`) and other
+listings Bloomberg-style, with a two-letter exchange code after a space
+(`VOD LN`, `7203 JP`). Yahoo wants a dash for share classes (`BRK-B`) and a
+dot suffix for the exchange (`VOD.L`, `7203.T`).
+"""
+
+import re
+
+# Bloomberg exchange code -> Yahoo Finance symbol suffix
+EXCHANGE_SUFFIXES = {
+    'US': '',
+    'CN': '.TO', 'CT': '.TO', 'CV': '.V',
+    'LN': '.L', 'ID': '.IR',
+    'GR': '.DE', 'GY': '.DE', 'FP': '.PA', 'NA': '.AS', 'BB': '.BR', 'PL': '.LS',
+    'IM': '.MI', 'SM': '.MC', 'SW': '.SW', 'VX': '.SW', 'AV': '.VI',
+    'SS': '.ST', 'NO': '.OL', 'DC': '.CO', 'FH': '.HE',
+    'JP': '.T', 'JT': '.T', 'HK': '.HK', 'KS': '.KS', 'TT': '.TW', 'SP': '.SI',
+    'AU': '.AX', 'NZ': '.NZ', 'IN': '.NS', 'MM': '.MX', 'BZ': '.SA',
+}
+
+_LISTING = re.compile(r'^(?P<base>\S+)\s+(?P<exchange>[A-Z]{2})$')
+
+
+def normalize_ticker(symbol):
+    """
+    Derive the Yahoo symbol and exchange code of a VIC ticker.
+
+    Args:
+        symbol: Ticker as posted on VIC (e.g. 'BRK.B' or 'VOD LN')
+
+    Returns:
+        Dict with 'yahoo_symbol' (None for an exchange code with no known
+        Yahoo suffix) and 'exchange'
+    """
+    symbol = ' '.join(symbol.split()).upper()
+    match = _LISTING.match(symbol)
+    if match:
+        base, exchange = match.group('base'), match.group('exchange')
+    else:
+        base, exchange = symbol, 'US'
+
+    suffix = EXCHANGE_SUFFIXES.get(exchange)
+    yahoo_symbol = None
+    if suffix is not None and ' ' not in base:
+        yahoo_symbol = re.sub(r'[./]', '-', base) + suffix
+
+    return {'yahoo_symbol': yahoo_symbol, 'exchange': exchange}
@@ -2,5 +2,6 @@
 
 from .yahoo_prices import YahooFinanceService
 from .xirr_calculator import XIRRCalculator
+from .exporter import ColumnarExporter
 
-__all__ = ['YahooFinanceService', 'XIRRCalculator']
+__all__ = ['YahooFinanceService', 'XIRRCalculator', 'ColumnarExporter']
@@ -0,0 +1,240 @@
+"""
+Columnar export of ideas, prices and author metrics as Arrow / Parquet
+"""
+
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from db.database import EXPORT_CHUNK, EXPORT_TABLES
+
+# Repeated strings are dictionary-encoded: stored once per batch/row group,
+# referenced by int32 index from every row
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+_TIMESTAMP = pa.timestamp('us')
+
+SCHEMAS = {
+    'ideas': pa.schema([
+        ('id', pa.int64()),
+        ('author_id', pa.int64()),
+        ('username', _DICT_STRING),
+        ('ticker', _DICT_STRING),
+        ('company_name', pa.string()),
+        ('posted_date', _TIMESTAMP),
+        ('position_type', _DICT_STRING),
+        ('price_at_rec', pa.float64()),
+        ('current_return', pa.float64()),
+        ('vic_idea_id', pa.string()),
+        ('idea_url', pa.string()),
+        ('scraped_at', _TIMESTAMP),
+        ('updated_at', _TIMESTAMP),
+    ]),
+    'prices': pa.schema([
+        ('id', pa.int64()),
+        ('ticker', _DICT_STRING),
+        ('current_price', pa.float64()),
+        ('last_updated', _TIMESTAMP),
+        ('price_changed_at', _TIMESTAMP),
+        ('fetch_failed', pa.bool_()),
+    ]),
+    'author_metrics': pa.schema([
+        ('id', pa.int64()),
+        ('author_id', pa.int64()),
+        ('username', _DICT_STRING),
+        ('xirr_5yr', pa.float64()),
+        ('xirr_3yr', pa.float64()),
+        ('xirr_1yr', pa.float64()),
+        ('total_picks', pa.int32()),
+        ('win_rate', pa.float64()),
+        ('best_pick_ticker', _DICT_STRING),
+        ('best_pick_return', pa.float64()),
+        ('rank_5yr', pa.int32()),
+        ('rank_3yr', pa.int32()),
+        ('rank_1yr', pa.int32()),
+        ('calculated_at', _TIMESTAMP),
+    ]),
+}
+
+# Watermarks of the last export per table, kept next to incremental exports
+# (the leading underscore makes Arrow dataset readers skip it)
+WATERMARKS_FILE = '_watermarks.json'
+
+PARQUET_COMPRESSION = 'zstd'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes out instead of keeping them"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ColumnarExporter:
+    """Streams Database tables into Arrow record batches and Parquet files"""
+
+    def __init__(self, db, chunk_size=EXPORT_CHUNK):
+        """
+        Args:
+            db: Database to export from
+            chunk_size: Rows read from the database and held per record batch
+        """
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def iter_batches(self, table: str, since: Optional[str] = None,
+                     until: Optional[str] = None) -> Iterator[Tuple[pa.RecordBatch, str]]:
+        """
+        Read a table as record batches of at most chunk_size rows.
+
+        Args:
+            table: One of EXPORT_TABLES
+            since: Watermark of a previous export; only later rows are read
+            until: Watermark to stop at (defaults to the table's current one)
+
+        Yields:
+            (record batch, watermark after the batch)
+        """
+        if until is None:
+            until = self.db.get_export_watermark(table)
+            if until is None:
+                return
+
+        schema = SCHEMAS[table]
+        after = since
+        while True:
+            columns, rows, after = self.db.export_rows(
+                table, after=after, until=until, limit=self.chunk_size
+            )
+            if not rows:
+                return
+
+            arrays = [
+                pa.array(values, type=schema.field(name).type)
+                for name, values in zip(columns, zip(*rows))
+            ]
+            yield pa.record_batch(arrays, schema=schema), after
+
+            if len(rows) < self.chunk_size:
+                return
+
+    def stream_ipc(self, table: str, since: Optional[str] = None,
+                   until: Optional[str] = None) -> Iterator[bytes]:
+        """Arrow IPC stream bytes for a table, one chunk per record batch"""
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(sink, SCHEMAS[table]) as writer:
+            for batch, _ in self.iter_batches(table, since, until):
+                writer.write_batch(batch)
+                yield sink.drain()
+        yield sink.drain()
+
+    def stream_parquet(self, table: str, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Iterator[bytes]:
+        """Parquet file bytes for a table, one chunk per row group"""
+        sink = _ChunkSink()
+        with pq.ParquetWriter(sink, SCHEMAS[table], compression=PARQUET_COMPRESSION) as writer:
+            for batch, _ in self.iter_batches(table, since, until):
+                writer.write_batch(batch)
+                yield sink.drain()
+        yield sink.drain()
+
+    def write_parquet(self, table: str, path: str, since: Optional[str] = None) -> Dict:
+        """
+        Write a table (or the rows after `since`) to a Parquet file.
+
+        Returns:
+            Dict with the 'rows' written and the export 'watermark' (None and
+            no file if there was nothing to write)
+        """
+        rows = 0
+        watermark = since
+        writer = None
+        # Written under a temporary name so an interrupted export leaves no
+        # truncated file behind
+        partial_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.partial')
+        try:
+            for batch, watermark in self.iter_batches(table, since):
+                if writer is None:
+                    writer = pq.ParquetWriter(partial_path, SCHEMAS[table],
+                                              compression=PARQUET_COMPRESSION)
+                writer.write_batch(batch)
+                rows += batch.num_rows
+            if writer is not None:
+                writer.close()
+                os.replace(partial_path, path)
+        except BaseException:
+            if writer is not None:
+                writer.close()
+                os.unlink(partial_path)
+            raise
+
+        return {'rows': rows, 'watermark': watermark}
+
+    def export_incremental(self, out_dir: str, tables=EXPORT_TABLES, full=False) -> Dict:
+        """
+        Export each table's new rows to a Parquet file in out_dir.
+
+        Files are written to out_dir/<table>/part-<UTC timestamp>.parquet, so
+        each table directory reads as one dataset. Watermarks are saved in
+        out_dir/_watermarks.json after each table is written, so the next run
+        continues from there.
+
+        Args:
+            out_dir: Export directory (created if missing)
+            tables: Tables to export
+            full: Ignore saved watermarks and export every row
+
+        Returns:
+            Dict mapping table to {'rows', 'path'} (path None if no new rows)
+        """
+        watermarks_path = os.path.join(out_dir, WATERMARKS_FILE)
+        watermarks = {}
+        if os.path.exists(watermarks_path):
+            with open(watermarks_path) as f:
+                watermarks = json.load(f)
+
+        # Microseconds, so runs within the same second don't overwrite each other
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        results = {}
+        for table in tables:
+            os.makedirs(os.path.join(out_dir, table), exist_ok=True)
+            path = os.path.join(out_dir, table, f'part-{stamp}.parquet')
+            since = None if full else watermarks.get(table)
+            written = self.write_parquet(table, path, since=since)
+
+            results[table] = {'rows': written['rows'], 'path': path if written['rows'] else None}
+            if written['rows']:
+                watermarks[table] = written['watermark']
+                self._save_watermarks(watermarks_path, watermarks)
+
+        return results
+
+    @staticmethod
+    def _save_watermarks(path, watermarks):
+        """Replace the watermarks file atomically"""
+        fd, tmp_path = tempfile.mkstemp(prefix='.watermarks-', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(watermarks, f, indent=2)
+        os.replace(tmp_path, path)
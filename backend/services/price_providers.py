@@ -0,0 +1,140 @@
+"""
+Price providers for YahooFinanceService
+
+A price provider is a callable taking a list of Yahoo symbols and returning
+a dict of symbol -> latest price for the symbols it found. Symbols missing
+from the result failed individually. A provider raises PriceFetchError when
+the request as a whole failed, so none of its symbols can be judged.
+
+A history provider is a callable taking a Yahoo symbol and an inclusive
+date range, returning a dict of date -> daily close for the trading days in
+it. An empty result means the symbol has no prices in the range; a request
+that failed raises PriceFetchError instead.
+"""
+
+import json
+import os
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import yfinance as yf
+
+try:
+    from yfinance.exceptions import YFPricesMissingError, YFTzMissingError
+    NO_PRICE_DATA_ERRORS = (YFPricesMissingError, YFTzMissingError)
+except ImportError:  # yfinance < 0.2.38: every error counts as a failed request
+    NO_PRICE_DATA_ERRORS = ()
+
+# JSON file of {symbol: price} to serve prices from instead of Yahoo
+PRICE_FIXTURE = os.environ.get('PRICE_FIXTURE')
+
+
+class PriceFetchError(Exception):
+    """A batched price request failed as a whole"""
+
+
+class YahooBatchProvider:
+    """Latest prices for many symbols per yfinance download request"""
+
+    def __call__(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Download the last few daily bars of every symbol in one request.
+
+        The last non-empty close is the current price: during trading hours
+        Yahoo returns today's bar with the latest trade as its close.
+
+        Raises:
+            PriceFetchError: If the request returned no data at all
+        """
+        try:
+            data = yf.download(
+                symbols, period='5d', interval='1d', auto_adjust=False, actions=False,
+                progress=False, threads=True
+            )
+        except Exception as e:
+            raise PriceFetchError(str(e)) from e
+
+        if data is None or data.empty:
+            raise PriceFetchError(f'No data returned for {len(symbols)} symbols')
+
+        closes = data['Close']
+        if closes.ndim == 1:  # Flat columns from a single-symbol download
+            closes = closes.to_frame(symbols[0])
+
+        prices = {}
+        for symbol in symbols:
+            if symbol not in closes.columns:
+                continue
+            series = closes[symbol].dropna()
+            if not series.empty:
+                prices[symbol] = float(series.iloc[-1])
+        return prices
+
+
+class YahooHistoryProvider:
+    """Daily closes of one symbol over a date range, from yfinance history"""
+
+    def __call__(self, symbol: str, start: date, end: date) -> Dict[date, float]:
+        """
+        Fetch the daily bars of a symbol from start to end, both inclusive.
+
+        Errors are raised rather than logged by yfinance, so that a symbol
+        with no prices in the range can be told apart from a failed request.
+
+        Raises:
+            PriceFetchError: If the request itself failed
+        """
+        try:
+            # yfinance treats end as exclusive
+            history = yf.Ticker(symbol).history(
+                start=start, end=end + timedelta(days=1), raise_errors=True
+            )
+        except NO_PRICE_DATA_ERRORS:
+            return {}
+        except Exception as e:
+            raise PriceFetchError(str(e)) from e
+
+        if history is None or history.empty:
+            return {}
+
+        closes = history['Close'].dropna()
+        return {idx.date(): float(close) for idx, close in closes.items()}
+
+
+class FixturePriceProvider:
+    """
+    Stand-in for YahooBatchProvider serving fixed prices, for benchmarks and
+    offline runs (set PRICE_FIXTURE to a JSON file of {symbol: price}).
+    """
+
+    def __init__(self, prices: Dict[str, float], latency=0.0, failures=0):
+        """
+        Args:
+            prices: Dict mapping symbol to price; other symbols fail
+            latency: Seconds each request takes
+            failures: Number of initial requests that fail as a whole
+        """
+        self.prices = prices
+        self.latency = latency
+        self.failures = failures
+        self.requests = []  # Symbols of each request, in order
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def __call__(self, symbols: List[str]) -> Dict[str, float]:
+        self.requests.append(list(symbols))
+        time.sleep(self.latency)
+        if len(self.requests) <= self.failures:
+            raise PriceFetchError('Simulated request failure')
+        return {s: self.prices[s] for s in symbols if self.prices.get(s) is not None}
+
+
+def default_price_provider():
+    """The fixture provider if PRICE_FIXTURE is set, otherwise Yahoo"""
+    if PRICE_FIXTURE:
+        return FixturePriceProvider.from_file(PRICE_FIXTURE)
+    return YahooBatchProvider()
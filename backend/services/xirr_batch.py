@@ -0,0 +1,143 @@
+"""
+Vectorized XIRR solver for many buy-and-hold portfolios at once
+"""
+
+from typing import Optional, Tuple
+import numpy as np
+
+# pyxirr uses an Actual/365 Fixed day count
+DAYS_PER_YEAR = 365.0
+
+
+def solve_xirr_batch(holding_years: np.ndarray, offsets: np.ndarray,
+                     terminal_values: np.ndarray, guess: Optional[np.ndarray] = None,
+                     max_iter: int = 50,
+                     tol: float = 1e-12) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Solve XIRR for many portfolios in one vectorized pass.
+
+    Each portfolio (group) invests $1 per position at the position's start
+    date and is valued at `terminal_values[g]` today. Its XIRR is the rate r
+    with sum((1 + r) ** years_i) == terminal_value, which we solve in
+    x = ln(1 + r) as log(sum(exp(years_i * x))) == log(terminal_value).
+    That function is convex and increasing, so Newton converges from any
+    start inside its bracket (after at most one overshoot from the left).
+    Groups without a guess start from the upper end of the bracket, and
+    bisection is kept as a fallback for anything that fails to converge.
+
+    Args:
+        holding_years: Flat array of holding periods (years to today) for
+                       every position of every group, grouped contiguously
+        offsets: Array of length n_groups + 1; group g owns
+                 holding_years[offsets[g]:offsets[g + 1]]
+        terminal_values: Array of length n_groups with each group's total
+                         current value
+        guess: Optional array of length n_groups with starting rates (e.g. the
+               previous run's results), NaN where there is none
+        max_iter: Max Newton iterations before falling back to bisection
+        tol: Convergence tolerance on x = ln(1 + r)
+
+    Returns:
+        Tuple of (rates, iterations, bracketed):
+            rates: Decimal rates (e.g. 0.155 for 15.5%), NaN where no rate exists.
+                   Degenerate groups where every position started today mirror
+                   pyxirr (-1.0, 0.0 or inf depending on the terminal value).
+            iterations: Newton iterations used per group (0 if not solved)
+            bracketed: True for groups that fell back to bisection
+    """
+    years = np.asarray(holding_years, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.asarray(terminal_values, dtype=float)
+
+    n_groups = len(offsets) - 1
+    counts = np.diff(offsets)
+    group_ids = np.repeat(np.arange(n_groups), counts)
+    rates = np.full(n_groups, np.nan)
+    iterations = np.zeros(n_groups, dtype=np.int64)
+    bracketed = np.zeros(n_groups, dtype=bool)
+
+    # Positions opened today contribute a constant 1 regardless of the rate
+    is_today = years <= 0
+    today_counts = np.bincount(group_ids, weights=is_today, minlength=n_groups)
+    residual = values - today_counts
+    open_counts = counts - today_counts
+
+    only_today = (counts > 0) & (open_counts == 0)
+    rates[only_today & (residual < 0)] = -1.0
+    rates[only_today & (residual == 0)] = 0.0
+    rates[only_today & (residual > 0)] = np.inf
+
+    solvable = (open_counts > 0) & (residual > 0)
+    if not solvable.any():
+        return rates, iterations, bracketed
+
+    # Compact the solvable groups and their (non-zero) holding periods
+    keep = ~is_today & solvable[group_ids]
+    years = years[keep]
+    solve_idx = np.flatnonzero(solvable)
+    remap = np.full(n_groups, -1)
+    remap[solve_idx] = np.arange(len(solve_idx))
+    group_ids = remap[group_ids[keep]]
+    sizes = open_counts[solve_idx]
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+
+    years_min = np.minimum.reduceat(years, starts)
+    years_max = np.maximum.reduceat(years, starts)
+    log_target = np.log(residual[solve_idx])
+
+    # log(m) + years_min * x and log(m) + years_max * x bound the objective,
+    # which brackets the root in closed form
+    a = log_target - np.log(sizes)
+    lo = np.minimum(a / years_min, a / years_max)
+    hi = np.maximum(a / years_min, a / years_max)
+
+    def objective(x):
+        shift = np.where(x >= 0, years_max, years_min) * x
+        terms = np.exp(years * x[group_ids] - shift[group_ids])
+        total = np.bincount(group_ids, weights=terms, minlength=len(x))
+        weighted = np.bincount(group_ids, weights=terms * years, minlength=len(x))
+        return np.log(total) + shift - log_target, weighted / total
+
+    x = hi.copy()
+    if guess is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            start = np.log1p(np.asarray(guess, dtype=float)[solve_idx])
+        usable = np.isfinite(start)
+        x[usable] = np.clip(start[usable], lo[usable], hi[usable])
+
+    converged = np.zeros(len(x), dtype=bool)
+    steps = np.zeros(len(x), dtype=np.int64)
+
+    for _ in range(max_iter):
+        h, dh = objective(x)
+        step = np.where(converged, 0.0, h / dh)
+        steps += ~converged
+        x = np.clip(x - step, lo, hi)
+        converged |= np.abs(step) <= tol * (1.0 + np.abs(x))
+        if converged.all():
+            break
+
+    # Bisection fallback for anything Newton didn't settle
+    pending = ~converged | ~np.isfinite(x)
+    if pending.any():
+        lo_b, hi_b = lo.copy(), hi.copy()
+        for _ in range(200):
+            mid = 0.5 * (lo_b + hi_b)
+            h, _ = objective(mid)
+            lo_b = np.where(h < 0, mid, lo_b)
+            hi_b = np.where(h < 0, hi_b, mid)
+        x = np.where(pending, 0.5 * (lo_b + hi_b), x)
+
+    with np.errstate(over='ignore'):
+        rates[solve_idx] = np.expm1(x)
+    iterations[solve_idx] = steps
+    bracketed[solve_idx] = pending
+
+    return rates, iterations, bracketed
+
+
+def to_percentage(rate: float) -> Optional[float]:
+    """Convert a decimal rate to a rounded percentage, None if undefined"""
+    if rate is None or rate != rate:  # NaN check
+        return None
+    return round(float(rate) * 100, 1)
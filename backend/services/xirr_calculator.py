@@ -2,10 +2,32 @@
 XIRR (Extended Internal Rate of Return) calculator using pyxirr
 """
 
+import multiprocessing
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
+import numpy as np
 import pyxirr
 
+from .xirr_batch import solve_xirr_batch, to_percentage, DAYS_PER_YEAR
+
+# Windows (in years) reported for every author
+WINDOWS = (5, 3, 1)
+
+# Metrics stored for an author with no ideas left in the 5-year window, so
+# their old XIRRs drop off the leaderboard
+EMPTY_METRICS = {
+    'xirr_5yr': None, 'xirr_3yr': None, 'xirr_1yr': None, 'total_picks': 0,
+    'win_rate': None, 'best_pick_ticker': None, 'best_pick_return': None
+}
+
+# Shards per worker process, so a slow shard doesn't leave other workers idle
+SHARDS_PER_WORKER = 4
+
+# Read-only snapshot of (ideas_by_author, current_prices, previous) held by each worker process
+_worker_snapshot = None
+
 
 class XIRRCalculator:
     """Calculator for XIRR metrics"""
@@ -13,7 +35,8 @@ class XIRRCalculator:
     def __init__(self):
         pass
 
-    def calculate_xirr(self, cashflows: List[Tuple[datetime, float]]) -> Optional[float]:
+    def calculate_xirr(self, cashflows: List[Tuple[datetime, float]],
+                       guess: Optional[float] = None) -> Optional[float]:
         """
         Calculate XIRR for a series of cashflows.
 
@@ -21,6 +44,7 @@ class XIRRCalculator:
             cashflows: List of (date, amount) tuples.
                        Negative = investment (outflow)
                        Positive = return (inflow)
+            guess: Optional starting rate as percentage (e.g. last run's result)
 
         Returns:
             Annualized return rate as percentage (e.g., 15.5 for 15.5%)
@@ -34,7 +58,7 @@ class XIRRCalculator:
             amounts = [cf[1] for cf in cashflows]
 
             # pyxirr returns a decimal (e.g., 0.155 for 15.5%)
-            result = pyxirr.xirr(dates, amounts)
+            result = pyxirr.xirr(dates, amounts, guess=guess / 100 if guess is not None else None)
 
             if result is None or result != result:  # NaN check
                 return None
@@ -46,6 +70,20 @@ class XIRRCalculator:
             print(f"XIRR calculation error: {e}")
             return None
 
+    @staticmethod
+    def _parse_posted_date(idea: dict) -> Optional[datetime]:
+        """Parse an idea's posted date (datetime or ISO string), None if unparseable"""
+        posted_date = idea.get('posted_date') or idea.get('postedDate')
+        if isinstance(posted_date, str):
+            try:
+                posted_date = datetime.fromisoformat(posted_date.replace('Z', '+00:00'))
+            except ValueError:
+                try:
+                    posted_date = datetime.strptime(posted_date, '%Y-%m-%d')
+                except ValueError:
+                    return None
+        return posted_date
+
     def calculate_for_ideas(self, ideas: List[dict], current_prices: Dict[str, float],
                             window_years: int = 5) -> Optional[float]:
         """
@@ -71,17 +109,7 @@ class XIRRCalculator:
             price_at_rec = idea.get('price_at_rec') or idea.get('priceAtRec')
             position_type = idea.get('position_type') or idea.get('positionType', 'long')
 
-            # Parse posted_date
-            posted_date = idea.get('posted_date') or idea.get('postedDate')
-            if isinstance(posted_date, str):
-                try:
-                    posted_date = datetime.fromisoformat(posted_date.replace('Z', '+00:00'))
-                except ValueError:
-                    try:
-                        posted_date = datetime.strptime(posted_date, '%Y-%m-%d')
-                    except ValueError:
-                        continue
-
+            posted_date = self._parse_posted_date(idea)
             if not posted_date or posted_date < cutoff_date:
                 continue
 
@@ -109,69 +137,275 @@ class XIRRCalculator:
 
         return self.calculate_xirr(cashflows)
 
-    def calculate_all_metrics(self, ideas: List[dict], current_prices: Dict[str, float]) -> dict:
+    def _normalize_ideas(self, ideas: List[dict], current_prices: Dict[str, float]) -> List[tuple]:
+        """
+        Parse and price every idea once.
+
+        Ideas loaded from the database carry a persisted 'current_return',
+        which is used as-is instead of repricing from current_prices.
+
+        Args:
+            ideas: List of idea dicts
+            current_prices: Dict mapping ticker to current price
+
+        Returns:
+            List of (posted_date, ticker, current_value, return_pct) tuples for
+            ideas with a usable price, sorted newest first
+        """
+        positions = []
+
+        for idea in ideas:
+            posted_date = self._parse_posted_date(idea)
+            if not posted_date:
+                continue
+
+            ticker = idea.get('ticker')
+
+            if 'current_return' in idea:
+                return_pct = idea['current_return']
+                if return_pct is not None:
+                    current_value = max(0, 1 + return_pct / 100)
+                    positions.append((posted_date, ticker, current_value, return_pct))
+                continue
+
+            price_at_rec = idea.get('price_at_rec') or idea.get('priceAtRec')
+            position_type = idea.get('position_type') or idea.get('positionType', 'long')
+            current_price = current_prices.get(ticker)
+
+            if not price_at_rec or price_at_rec <= 0 or not current_price:
+                continue
+
+            # Value of a $1 investment today, and the plain percentage return
+            if position_type == 'long':
+                current_value = current_price / price_at_rec
+                return_pct = ((current_price - price_at_rec) / price_at_rec) * 100
+            else:
+                current_value = max(0, (2 * price_at_rec - current_price) / price_at_rec)
+                return_pct = ((price_at_rec - current_price) / price_at_rec) * 100
+
+            positions.append((posted_date, ticker, current_value, return_pct))
+
+        # Stable sort keeps input order for ideas posted on the same date
+        positions.sort(key=lambda p: p[0], reverse=True)
+        return positions
+
+    def calculate_all_metrics(self, ideas: List[dict], current_prices: Dict[str, float],
+                              previous: Optional[dict] = None,
+                              solver_stats: Optional[dict] = None) -> dict:
         """
         Calculate all XIRR metrics for an author's ideas.
 
+        Ideas are normalized once into a newest-first list, so each window is
+        a prefix of it and the cashflows are built a single time.
+
         Args:
             ideas: List of idea dicts
             current_prices: Dict mapping ticker to current price
+            previous: Optional dict with the author's last xirr_5yr/3yr/1yr,
+                      used as starting guesses
+            solver_stats: Optional dict to accumulate solve counts into (pyxirr
+                          doesn't report its iterations)
 
         Returns:
             Dict with xirr_5yr, xirr_3yr, xirr_1yr, total_picks, win_rate, best_pick
         """
-        result = {
-            'xirr_5yr': self.calculate_for_ideas(ideas, current_prices, window_years=5),
-            'xirr_3yr': self.calculate_for_ideas(ideas, current_prices, window_years=3),
-            'xirr_1yr': self.calculate_for_ideas(ideas, current_prices, window_years=1),
-            'total_picks': 0,
+        positions = self._normalize_ideas(ideas, current_prices)
+        today = datetime.now()
+
+        # -$1 at recommendation, +current_value today, newest idea first
+        cashflows = []
+        for posted_date, _, current_value, _ in positions:
+            cashflows.append((posted_date, -1.0))
+            cashflows.append((today, current_value))
+
+        oldest_first = [p[0] for p in reversed(positions)]
+        previous = previous or {}
+        window_sizes = {}
+        result = {}
+
+        for window in WINDOWS:
+            key = f'xirr_{window}yr'
+            cutoff = today - timedelta(days=window * 365)
+            window_sizes[window] = len(positions) - bisect_left(oldest_first, cutoff)
+            result[key] = self.calculate_xirr(
+                cashflows[:2 * window_sizes[window]], guess=previous.get(key)
+            )
+            if solver_stats is not None and window_sizes[window]:
+                _merge_solver_stats(solver_stats, {
+                    'solves': 1, 'warm_started': int(previous.get(key) is not None)
+                })
+
+        # Stats over the 5-year window
+        picks = positions[:window_sizes[5]]
+        result.update({
+            'total_picks': len(picks),
             'win_rate': None,
             'best_pick_ticker': None,
             'best_pick_return': None
-        }
+        })
 
-        # Calculate stats for 5-year window
-        cutoff = datetime.now() - timedelta(days=5 * 365)
-        valid_ideas = []
+        if picks:
+            # Win rate
+            winners = sum(1 for p in picks if p[3] > 0)
+            result['win_rate'] = round((winners / len(picks)) * 100, 1)
 
-        for idea in ideas:
-            posted_date = idea.get('posted_date') or idea.get('postedDate')
-            if isinstance(posted_date, str):
-                try:
-                    posted_date = datetime.fromisoformat(posted_date.replace('Z', '+00:00'))
-                except ValueError:
-                    continue
+            # Best pick
+            best = max(picks, key=lambda p: p[3])
+            result['best_pick_ticker'] = best[1]
+            result['best_pick_return'] = round(best[3], 1)
 
-            if posted_date and posted_date >= cutoff:
-                ticker = idea.get('ticker')
-                price_at_rec = idea.get('price_at_rec') or idea.get('priceAtRec')
-                position_type = idea.get('position_type') or idea.get('positionType', 'long')
-                current_price = current_prices.get(ticker)
+        return result
 
-                if price_at_rec and price_at_rec > 0 and current_price:
-                    if position_type == 'long':
-                        return_pct = ((current_price - price_at_rec) / price_at_rec) * 100
-                    else:
-                        return_pct = ((price_at_rec - current_price) / price_at_rec) * 100
+    def calculate_metrics_batch(self, ideas_by_author: Dict[str, List[dict]],
+                                current_prices: Dict[str, float],
+                                previous: Optional[Dict[str, dict]] = None,
+                                solver_stats: Optional[dict] = None) -> Dict[str, dict]:
+        """
+        Calculate all metrics for many authors with one vectorized pass.
 
-                    valid_ideas.append({
-                        'ticker': ticker,
-                        'return_pct': return_pct
-                    })
+        Flattens every author's ideas into NumPy arrays, packs the cashflows
+        for each author x window into contiguous groups and solves them all
+        together. Results match calling calculate_all_metrics for each author.
 
-        result['total_picks'] = len(valid_ideas)
+        Args:
+            ideas_by_author: Dict mapping username to list of idea dicts
+            current_prices: Dict mapping ticker to current price
+            previous: Optional dict mapping username to last run's metrics,
+                      whose XIRRs are used as starting guesses
+            solver_stats: Optional dict to accumulate solver iteration counts into
 
-        if valid_ideas:
-            # Win rate
-            winners = sum(1 for i in valid_ideas if i['return_pct'] > 0)
-            result['win_rate'] = round((winners / len(valid_ideas)) * 100, 1)
+        Returns:
+            Dict mapping username to metrics dict (same shape as calculate_all_metrics)
+        """
+        usernames = list(ideas_by_author.keys())
+        n_authors = len(usernames)
+        ideas = [idea for username in usernames for idea in ideas_by_author[username]]
+        author_idx = np.repeat(
+            np.arange(n_authors), [len(ideas_by_author[u]) for u in usernames]
+        )
 
-            # Best pick
-            best = max(valid_ideas, key=lambda x: x['return_pct'])
-            result['best_pick_ticker'] = best['ticker']
-            result['best_pick_return'] = round(best['return_pct'], 1)
+        tickers = [idea.get('ticker') for idea in ideas]
+        price_at_rec = np.array(
+            [idea.get('price_at_rec') or idea.get('priceAtRec') or 0 for idea in ideas],
+            dtype=float
+        )
+        current = np.array([current_prices.get(t) or 0 for t in tickers], dtype=float)
+        is_long = np.array([
+            (idea.get('position_type') or idea.get('positionType', 'long')) == 'long'
+            for idea in ideas
+        ], dtype=bool)
+        posted = self._posted_dates_array(ideas)
+
+        valid = (price_at_rec > 0) & (current > 0) & ~np.isnat(posted)
+        safe_rec = np.where(valid, price_at_rec, 1.0)
+        current_value = np.where(
+            is_long, current / safe_rec,
+            np.maximum(0, (2 * safe_rec - current) / safe_rec)
+        )
+        return_pct = np.where(
+            is_long, (current - safe_rec) / safe_rec, (safe_rec - current) / safe_rec
+        ) * 100
+
+        # Persisted returns (ideas loaded from the database) override repricing
+        has_return = np.array(['current_return' in idea for idea in ideas], dtype=bool)
+        if has_return.any():
+            stored = np.array([
+                np.nan if idea.get('current_return') is None else idea['current_return']
+                for idea in ideas
+            ], dtype=float)
+            valid = np.where(has_return, ~np.isnan(stored) & ~np.isnat(posted), valid)
+            return_pct = np.where(has_return, stored, return_pct)
+            current_value = np.where(has_return, np.maximum(0, 1 + stored / 100), current_value)
+
+        # pyxirr counts whole days between dates
+        today = datetime.now()
+        holding_years = (
+            np.datetime64(today.date(), 'D') - posted.astype('datetime64[D]')
+        ).astype(float) / DAYS_PER_YEAR
+
+        # One cashflow group per author x window, contiguous by group id
+        n_windows = len(WINDOWS)
+        window_masks = [
+            valid & (posted >= np.datetime64(today - timedelta(days=w * 365), 'us'))
+            for w in WINDOWS
+        ]
+        group_ids = np.concatenate([
+            author_idx[mask] * n_windows + w for w, mask in enumerate(window_masks)
+        ])
+        order = np.argsort(group_ids, kind='stable')
+        group_years = np.concatenate([holding_years[mask] for mask in window_masks])[order]
+        group_values = np.concatenate([current_value[mask] for mask in window_masks])
+
+        n_groups = n_authors * n_windows
+        counts = np.bincount(group_ids, minlength=n_groups)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        terminal_values = np.bincount(group_ids, weights=group_values, minlength=n_groups)
+
+        guess = np.full(n_groups, np.nan)
+        for a, username in enumerate(usernames):
+            prev = (previous or {}).get(username) or {}
+            for w, window in enumerate(WINDOWS):
+                if prev.get(f'xirr_{window}yr') is not None:
+                    guess[a * n_windows + w] = prev[f'xirr_{window}yr'] / 100
+
+        rates, iterations, bracketed = solve_xirr_batch(
+            group_years, offsets, terminal_values, guess=guess
+        )
 
-        return result
+        if solver_stats is not None:
+            solved = iterations > 0
+            _merge_solver_stats(solver_stats, {
+                'solves': int(solved.sum()),
+                'warm_started': int((solved & ~np.isnan(guess)).sum()),
+                'iterations': int(iterations.sum()),
+                'max_iterations': int(iterations.max()) if len(iterations) else 0,
+                'bracketed': int(bracketed.sum())
+            })
+
+        # Pick stats over the 5-year window
+        stats_mask = window_masks[WINDOWS.index(5)]
+        stats_author = author_idx[stats_mask]
+        stats_return = return_pct[stats_mask]
+        total_picks = np.bincount(stats_author, minlength=n_authors)
+        winners = np.bincount(stats_author, weights=stats_return > 0, minlength=n_authors)
+
+        # Best pick = first idea with the max return, per author
+        stats_pos = np.flatnonzero(stats_mask)
+        best_order = np.lexsort((stats_pos, -stats_return, stats_author))
+        first = np.ones(len(best_order), dtype=bool)
+        first[1:] = stats_author[best_order][1:] != stats_author[best_order][:-1]
+        best_pos = np.full(n_authors, -1)
+        best_pos[stats_author[best_order][first]] = stats_pos[best_order][first]
+
+        results = {}
+        for a, username in enumerate(usernames):
+            metrics = {}
+            for w, window in enumerate(WINDOWS):
+                g = a * n_windows + w
+                # calculate_xirr needs at least one position (two cashflows)
+                metrics[f'xirr_{window}yr'] = to_percentage(rates[g]) if counts[g] else None
+
+            picks = int(total_picks[a])
+            metrics.update({
+                'total_picks': picks,
+                'win_rate': round((int(winners[a]) / picks) * 100, 1) if picks else None,
+                'best_pick_ticker': tickers[best_pos[a]] if picks else None,
+                'best_pick_return': round(float(return_pct[best_pos[a]]), 1) if picks else None
+            })
+            results[username] = metrics
+
+        return results
+
+    def _posted_dates_array(self, ideas: List[dict]) -> np.ndarray:
+        """Parse every idea's posted date into a datetime64 array (NaT if unparseable)"""
+        raw = [idea.get('posted_date') or idea.get('postedDate') for idea in ideas]
+        try:
+            return np.array(raw, dtype='datetime64[us]')
+        except ValueError:
+            parsed = [self._parse_posted_date(idea) for idea in ideas]
+            return np.array(
+                [p.replace(tzinfo=None) if p else None for p in parsed], dtype='datetime64[us]'
+            )
 
     def calculate_for_author(self, db, username: str) -> dict:
         """
@@ -190,13 +424,8 @@ class XIRRCalculator:
         if not ideas:
             return {'error': 'No ideas found'}
 
-        # Get current prices
-        tickers = list(set(idea['ticker'] for idea in ideas))
-        prices = {ticker: db.get_price(ticker) for ticker in tickers}
-        prices = {k: v for k, v in prices.items() if v}  # Filter None
-
-        # Calculate metrics
-        metrics = self.calculate_all_metrics(ideas, prices)
+        # Ideas carry their persisted returns, so no price lookups are needed
+        metrics = self.calculate_all_metrics(ideas, {})
 
         # Store in database
         db.update_author_metrics(
@@ -212,19 +441,151 @@ class XIRRCalculator:
 
         return metrics
 
-    def update_all_metrics(self, db, progress_callback=None):
+    def update_all_metrics(self, db, progress_callback=None, vectorized=True, full=False,
+                           workers=1):
         """
-        Recalculate metrics for all authors.
+        Recalculate metrics for authors whose inputs changed.
+
+        By default only authors with new ideas, repriced tickers or ideas that
+        aged out of a window since their last calculation are recomputed.
 
         Args:
             db: Database instance
             progress_callback: Optional callback(username, metrics)
+            vectorized: Solve all authors in one batch (False = per-author pyxirr)
+            full: Recalculate every author regardless of what changed
+            workers: Number of worker processes to shard authors across (1 = in-process)
 
         Returns:
             Summary dict with counts
         """
-        authors = db.get_all_authors()
-        prices = db.get_all_prices()
+        authors = db.get_all_authors() if full else db.get_authors_needing_metrics()
+        print(f"Recalculating metrics for {len(authors)} authors ({'full' if full else 'incremental'})")
+
+        previous = db.get_author_xirrs()
+
+        if not vectorized and workers <= 1:
+            summary = self._update_all_metrics_per_author(db, authors, previous, progress_callback)
+            summary['full'] = full
+            return summary
+
+        # Ideas carry their persisted returns, so no price map is needed
+        prices = {}
+        solver_stats = {}
+
+        # One ordered query for every author's in-window ideas
+        author_ids = {a['username']: a['id'] for a in authors}
+        ideas_by_author = db.get_ideas_for_authors(
+            None if full else list(author_ids.values()), years=5
+        )
+        if full:
+            # Authors added since get_all_authors have no metrics yet, so the
+            # next incremental run picks them up
+            ideas_by_author = {
+                username: ideas for username, ideas in ideas_by_author.items()
+                if username in author_ids
+            }
+        failed = 0
+
+        if workers > 1:
+            print(f"Calculating metrics for {len(ideas_by_author)} authors across {workers} workers...")
+            all_metrics = self.calculate_metrics_parallel(
+                ideas_by_author, prices, workers, vectorized, progress_callback,
+                previous=previous, solver_stats=solver_stats
+            )
+            # Progress was already reported as shards completed
+            progress_callback = None
+        else:
+            print(f"Calculating metrics for {len(ideas_by_author)} authors in batch...")
+            all_metrics = self.calculate_metrics_batch(
+                ideas_by_author, prices, previous=previous, solver_stats=solver_stats
+            )
+
+        # Authors whose ideas all aged out of the window get empty metrics
+        for author in authors:
+            if author['username'] not in ideas_by_author:
+                all_metrics[author['username']] = dict(EMPTY_METRICS)
+
+        # One transaction for every author's metrics
+        try:
+            success = db.update_author_metrics_bulk([
+                {'author_id': author_ids[username], 'username': username, **metrics}
+                for username, metrics in all_metrics.items()
+            ])
+        except Exception as e:
+            print(f"Error storing metrics: {e}")
+            success = 0
+            failed += len(all_metrics)
+        else:
+            if progress_callback:
+                for username, metrics in all_metrics.items():
+                    progress_callback(username, metrics)
+
+        return {
+            'success': success,
+            'failed': failed,
+            'total': len(authors),
+            'full': full,
+            'solver': _summarize_solver_stats(solver_stats)
+        }
+
+    def calculate_metrics_parallel(self, ideas_by_author: Dict[str, List[dict]],
+                                   current_prices: Dict[str, float], workers: int,
+                                   vectorized: bool = True, progress_callback=None,
+                                   previous: Optional[Dict[str, dict]] = None,
+                                   solver_stats: Optional[dict] = None) -> Dict[str, dict]:
+        """
+        Calculate metrics for many authors, sharded across worker processes.
+
+        The ideas and prices are handed to each worker once as a read-only
+        snapshot (inherited copy-on-write where the platform forks), so tasks
+        only carry the usernames of their shard.
+
+        Args:
+            ideas_by_author: Dict mapping username to list of idea dicts
+            current_prices: Dict mapping ticker to current price
+            workers: Number of worker processes
+            vectorized: Use the batch solver inside each shard
+            progress_callback: Optional callback(username, metrics), called as shards finish
+            previous: Optional dict mapping username to last run's metrics (starting guesses)
+            solver_stats: Optional dict to accumulate solver iteration counts into
+
+        Returns:
+            Dict mapping username to metrics dict
+        """
+        # Deal authors out largest-first so shards carry similar numbers of ideas
+        usernames = sorted(ideas_by_author, key=lambda u: len(ideas_by_author[u]), reverse=True)
+        n_shards = min(len(usernames), workers * SHARDS_PER_WORKER)
+        shards = [usernames[i::n_shards] for i in range(n_shards)]
+
+        try:
+            mp_context = multiprocessing.get_context('fork')
+        except ValueError:
+            mp_context = None
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_metrics_worker,
+                                 initargs=(ideas_by_author, current_prices, previous)) as executor:
+            futures = [
+                executor.submit(_calculate_metrics_shard, shard, vectorized) for shard in shards
+            ]
+            for future in as_completed(futures):
+                shard_metrics, shard_stats = future.result()
+                results.update(shard_metrics)
+                if solver_stats is not None:
+                    _merge_solver_stats(solver_stats, shard_stats)
+
+                if progress_callback:
+                    for username, metrics in shard_metrics.items():
+                        progress_callback(username, metrics)
+
+        return results
+
+    def _update_all_metrics_per_author(self, db, authors, previous=None, progress_callback=None):
+        """Recalculate metrics author by author with scalar pyxirr solves"""
+        prices = {}  # Ideas carry their persisted returns
+        solver_stats = {}
 
         success = 0
         failed = 0
@@ -236,11 +597,13 @@ class XIRRCalculator:
             try:
                 ideas = db.get_ideas_for_author(username, years=5)
 
-                if not ideas:
-                    failed += 1
-                    continue
-
-                metrics = self.calculate_all_metrics(ideas, prices)
+                if ideas:
+                    metrics = self.calculate_all_metrics(
+                        ideas, prices, (previous or {}).get(username), solver_stats
+                    )
+                else:
+                    # All of their ideas aged out of the window
+                    metrics = dict(EMPTY_METRICS)
 
                 db.update_author_metrics(
                     username,
@@ -250,7 +613,8 @@ class XIRRCalculator:
                     total_picks=metrics['total_picks'],
                     win_rate=metrics['win_rate'],
                     best_pick_ticker=metrics['best_pick_ticker'],
-                    best_pick_return=metrics['best_pick_return']
+                    best_pick_return=metrics['best_pick_return'],
+                    rebuild_ranks=False
                 )
 
                 success += 1
@@ -262,8 +626,63 @@ class XIRRCalculator:
                 print(f"Error calculating metrics for {username}: {e}")
                 failed += 1
 
+        db.rebuild_ranks()
+
         return {
             'success': success,
             'failed': failed,
-            'total': len(authors)
+            'total': len(authors),
+            'solver': _summarize_solver_stats(solver_stats)
         }
+
+
+def _merge_solver_stats(into: dict, stats: dict):
+    """Accumulate solver iteration counts from one batch into a running total"""
+    for key, value in stats.items():
+        if key == 'max_iterations':
+            into[key] = max(into.get(key, 0), value)
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def _summarize_solver_stats(stats: dict) -> dict:
+    """
+    Solver iteration counts for the run summary. Iteration and bisection
+    counts are None when the solves went through pyxirr, which doesn't
+    report them.
+    """
+    solves = stats.get('solves', 0)
+    counted = 'iterations' in stats or not solves
+    iterations = stats.get('iterations', 0) if counted else None
+    return {
+        'solves': solves,
+        'warmStarted': stats.get('warm_started', 0),
+        'iterations': iterations,
+        'avgIterations': round(iterations / solves, 2) if counted and solves else None,
+        'maxIterations': stats.get('max_iterations', 0) if counted else None,
+        'bracketed': stats.get('bracketed', 0) if counted else None
+    }
+
+
+def _init_metrics_worker(ideas_by_author, current_prices, previous):
+    """Process pool initializer: keep the shared snapshot for this worker"""
+    global _worker_snapshot
+    _worker_snapshot = (ideas_by_author, current_prices, previous)
+
+
+def _calculate_metrics_shard(usernames, vectorized=True):
+    """Calculate metrics and solver stats for one shard of authors inside a worker process"""
+    ideas_by_author, current_prices, previous = _worker_snapshot
+    previous = previous or {}
+    calc = XIRRCalculator()
+
+    if vectorized:
+        shard = {u: ideas_by_author[u] for u in usernames}
+        stats = {}
+        return calc.calculate_metrics_batch(shard, current_prices, previous, stats), stats
+
+    stats = {}
+    return {
+        u: calc.calculate_all_metrics(ideas_by_author[u], current_prices, previous.get(u), stats)
+        for u in usernames
+    }, stats
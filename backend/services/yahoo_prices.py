@@ -2,24 +2,52 @@
 Yahoo Finance price fetching service using yfinance
 """
 
+import os
 import yfinance as yf
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import time
 
+from db.ticker_symbols import normalize_ticker
+from .price_providers import PriceFetchError, YahooHistoryProvider, default_price_provider
+
+# Fetched prices are written (and fanned out to idea returns) this many tickers at a time
+PRICE_WRITE_CHUNK = 100
+
+# Symbols per batched price request (0 = one yfinance .info lookup per ticker)
+PRICE_BATCH_SIZE = int(os.environ.get('PRICE_BATCH_SIZE', 200))
+
+# Extra attempts for a batched request that fails as a whole
+PRICE_BATCH_RETRIES = 2
+
+# A historical price may come from a trading day this many days around the date
+HISTORY_WINDOW_DAYS = 7
+
 
 class YahooFinanceService:
     """Service for fetching stock prices from Yahoo Finance"""
 
-    def __init__(self, rate_limit_delay=0.5):
+    def __init__(self, rate_limit_delay=0.5, batch_size=PRICE_BATCH_SIZE, price_provider=None,
+                 db=None, history_provider=None):
         """
         Initialize the service.
 
         Args:
             rate_limit_delay: Seconds to wait between API calls
+            batch_size: Symbols per batched current-price request (0 = per-ticker lookups)
+            price_provider: Batched price source (defaults to Yahoo, or the
+                            PRICE_FIXTURE file if set; see price_providers)
+            db: Database to keep fetched daily closes in (in memory only if None)
+            history_provider: Daily close source (defaults to Yahoo)
         """
         self.rate_limit_delay = rate_limit_delay
+        self.batch_size = batch_size
+        self.price_provider = price_provider or default_price_provider()
+        self.db = db
+        self.history_provider = history_provider or YahooHistoryProvider()
         self._cache = {}  # Simple in-memory cache
+        self._history = {}  # Ticker -> daily close history, see _ensure_history
 
     def get_current_price(self, ticker: str) -> Optional[float]:
         """
@@ -63,106 +91,273 @@ class YahooFinanceService:
         """
         Get the historical closing price for a ticker on a specific date.
 
+        The close is looked up in the ticker's daily close history, which is
+        fetched from Yahoo only for days it doesn't cover yet. With a
+        database the history is kept in its daily_closes table, so repeated
+        lookups and re-runs make no network calls.
+
         Args:
             ticker: Stock ticker symbol
             date: Date to get price for
 
         Returns:
-            Closing price on that date or nearest trading day, None if unavailable
+            Closing price on that date or the nearest trading day before it
+            (after it if there was none in the week before), None if unavailable
         """
         try:
-            # Check cache
-            cache_key = f"hist_{ticker}_{date.strftime('%Y-%m-%d')}"
-            cached = self._cache.get(cache_key)
-            if cached:
-                return cached['price']
+            target = date.date() if isinstance(date, datetime) else date
+            window = timedelta(days=HISTORY_WINDOW_DAYS)
+            history = self._ensure_history(ticker, target - window, target + window)
+            return self._close_near(history, target)
 
-            time.sleep(self.rate_limit_delay)
-
-            stock = yf.Ticker(ticker)
-
-            # Fetch data for a range around the date (to handle weekends/holidays)
-            start_date = date - timedelta(days=7)
-            end_date = date + timedelta(days=7)
-
-            history = stock.history(start=start_date, end=end_date)
-
-            if history.empty:
-                return None
-
-            # Find the closest date to the target
-            target_date = date.date() if hasattr(date, 'date') else date
+        except Exception as e:
+            print(f"Error fetching historical price for {ticker} on {date}: {e}")
+            return None
 
-            # Try to get exact date or nearest before
-            for idx in history.index:
-                idx_date = idx.date() if hasattr(idx, 'date') else idx
-                if idx_date <= target_date:
-                    price = history.loc[idx, 'Close']
-                    self._cache[cache_key] = {'price': float(price), 'time': datetime.now()}
-                    return float(price)
+    def prefetch_history(self, ideas: List[dict]):
+        """
+        Fetch the daily closes needed for a batch of ideas up front, one
+        request per ticker spanning all of its ideas' posted dates, so the
+        per-idea lookups that follow stay local.
 
-            # If no date before, get the first available
-            if not history.empty:
-                price = history.iloc[0]['Close']
-                self._cache[cache_key] = {'price': float(price), 'time': datetime.now()}
-                return float(price)
+        Args:
+            ideas: List of idea dicts with 'ticker' and 'posted_date'
+        """
+        spans = {}
+        for idea in ideas:
+            ticker = idea.get('ticker')
+            posted_date = idea.get('posted_date')
+            if not ticker or not posted_date:
+                continue
+            day = self._parse_posted_date(posted_date).date()
+            first, last = spans.get(ticker.upper(), (day, day))
+            spans[ticker.upper()] = (min(first, day), max(last, day))
+
+        window = timedelta(days=HISTORY_WINDOW_DAYS)
+        for ticker, (first, last) in spans.items():
+            try:
+                self._ensure_history(ticker, first - window, last + window)
+            except Exception as e:
+                print(f"Error fetching price history for {ticker}: {e}")
+
+    def _ensure_history(self, ticker: str, start, end) -> Dict:
+        """
+        Get a ticker's daily close history, first fetching whatever part of
+        start..end it doesn't cover yet.
 
-            return None
+        The covered span (closes_from..closes_to) is kept contiguous, so only
+        the stretches before and after it are ever fetched. Days from today
+        on are left uncovered, since their closes can still change.
 
-        except Exception as e:
-            print(f"Error fetching historical price for {ticker} on {date}: {e}")
-            return None
+        Returns:
+            History dict as returned by Database.get_daily_closes
+        """
+        ticker = ticker.upper()
+        history = self._history.get(ticker)
+        if history is None:
+            if self.db:
+                history = self.db.get_daily_closes(ticker)
+            else:
+                history = {
+                    'yahoo_symbol': normalize_ticker(ticker)['yahoo_symbol'],
+                    'closes_from': None, 'closes_to': None, 'days': [], 'closes': []
+                }
+            history['failed'] = []  # Ranges whose request failed this run
+            self._history[ticker] = history
+
+        end = min(end, datetime.utcnow().date() - timedelta(days=1))
+        one_day = timedelta(days=1)
+        if history['closes_from'] is None:
+            gaps = [(start, end)]
+        else:
+            gaps = [(start, history['closes_from'] - one_day),
+                    (history['closes_to'] + one_day, end)]
+
+        for gap_start, gap_end in gaps:
+            if gap_start <= gap_end:
+                self._fetch_history(ticker, history, gap_start, gap_end)
+        return history
+
+    def _fetch_history(self, ticker: str, history: Dict, start, end):
+        """Fetch a ticker's closes from start to end and merge them into its history"""
+        if any(s <= start and end <= e for s, e in history['failed']):
+            return
+
+        time.sleep(self.rate_limit_delay)
+        try:
+            closes = self.history_provider(history['yahoo_symbol'] or ticker, start, end)
+        except PriceFetchError as e:
+            # Not stored, so the range is retried on the next run
+            print(f"Error fetching price history for {ticker}: {e}")
+            history['failed'].append((start, end))
+            return
+
+        # An empty range is stored as covered too, so it isn't requested again
+        if self.db:
+            self.db.save_daily_closes(ticker, closes, start, end)
+
+        merged = dict(zip(history['days'], history['closes']))
+        merged.update(closes)
+        history['days'] = sorted(merged)
+        history['closes'] = [merged[day] for day in history['days']]
+        history['closes_from'] = min(filter(None, [history['closes_from'], start]))
+        history['closes_to'] = max(filter(None, [history['closes_to'], end]))
+
+    @staticmethod
+    def _close_near(history: Dict, target) -> Optional[float]:
+        """Close on target or the nearest trading day before it, binary searched"""
+        days, closes = history['days'], history['closes']
+        window = timedelta(days=HISTORY_WINDOW_DAYS)
+
+        i = bisect_right(days, target) - 1
+        if i >= 0 and days[i] >= target - window:
+            return closes[i]
+
+        # No trading day in the week before (e.g. a fresh listing): take the first after
+        if i + 1 < len(days) and days[i + 1] <= target + window:
+            return closes[i + 1]
+
+        return None
+
+    @staticmethod
+    def _parse_posted_date(posted_date) -> datetime:
+        """Parse an idea's posted_date if it is a string"""
+        if isinstance(posted_date, str):
+            try:
+                return datetime.fromisoformat(posted_date.replace('Z', '+00:00'))
+            except ValueError:
+                return datetime.strptime(posted_date, '%Y-%m-%d')
+        return posted_date
 
     def get_prices_batch(self, tickers: List[str]) -> Dict[str, Optional[float]]:
         """
-        Get current prices for multiple tickers.
+        Get current prices for multiple tickers, batch_size symbols per request.
 
         Args:
-            tickers: List of ticker symbols
+            tickers: List of Yahoo symbols
 
         Returns:
             Dict mapping ticker to price (None if unavailable)
         """
-        results = {}
+        prices, _ = self._fetch_batched(tickers)
+        return {ticker: prices.get(ticker) for ticker in tickers}
 
-        for ticker in tickers:
-            results[ticker] = self.get_current_price(ticker)
+    def _fetch_batched(self, symbols: List[str]) -> Tuple[Dict[str, float], List[str]]:
+        """
+        Fetch current prices batch_size symbols per provider request.
+
+        A request that fails as a whole is retried PRICE_BATCH_RETRIES times.
+        Symbols missing from a successful response failed individually.
+
+        Returns:
+            (dict mapping symbol to price, symbols whose request never succeeded)
+        """
+        symbols = sorted(set(symbols))
+        batch_size = max(self.batch_size, 1)
+        prices = {}
+        unfetched = []
+
+        for start in range(0, len(symbols), batch_size):
+            chunk = symbols[start:start + batch_size]
+            for attempt in range(PRICE_BATCH_RETRIES + 1):
+                if start or attempt:
+                    time.sleep(self.rate_limit_delay * (attempt + 1))
+                try:
+                    prices.update(self.price_provider(chunk))
+                    break
+                except PriceFetchError as e:
+                    print(f"Price request for {len(chunk)} tickers failed "
+                          f"(attempt {attempt + 1}): {e}")
+            else:
+                unfetched.extend(chunk)
 
-        return results
+        return prices, unfetched
 
     def update_all_prices(self, db, max_age_hours=24):
         """
         Update all stale prices in the database.
 
+        With batch_size > 0, prices are requested batch_size tickers at a
+        time and written in one bulk upsert; otherwise each ticker is looked
+        up on its own.
+
         Args:
             db: Database instance
             max_age_hours: Max age of prices before refresh
 
         Returns:
-            Dict with counts of updated/failed tickers
+            Dict with counts of updated/failed tickers (and 'skipped' ones
+            whose batched request failed as a whole)
         """
         tickers = db.get_tickers_needing_update(max_age_hours)
         print(f"Found {len(tickers)} tickers needing price update")
 
+        # Request each ticker under its Yahoo symbol ('VOD LN' -> 'VOD.L')
+        yahoo_symbols = db.get_yahoo_symbols(tickers)
+        requested = {ticker: yahoo_symbols.get(ticker) or ticker for ticker in tickers}
+
+        if self.batch_size > 0:
+            return self._update_prices_batched(db, requested)
+
         updated = 0
         failed = 0
+        pending = {}
 
         for ticker in tickers:
-            price = self.get_current_price(ticker)
+            price = self.get_current_price(requested[ticker])
 
             if price:
-                db.update_price(ticker, price, fetch_failed=False)
+                pending[ticker] = price
                 updated += 1
             else:
-                db.update_price(ticker, None, fetch_failed=True)
+                pending[ticker] = None
                 failed += 1
 
+            if len(pending) >= PRICE_WRITE_CHUNK:
+                db.update_prices_bulk(pending)
+                pending = {}
+
+        db.update_prices_bulk(pending)
+
         return {
             'updated': updated,
             'failed': failed,
             'total': len(tickers)
         }
 
+    def _update_prices_batched(self, db, requested: Dict[str, str]) -> Dict:
+        """
+        Refresh prices with batched requests and write them in one bulk upsert.
+
+        Tickers missing from a response are written as failed fetches.
+        Tickers whose whole request kept failing are not written at all, so
+        an outage doesn't wipe their last known price; they stay stale and
+        are retried on the next refresh.
+
+        Args:
+            db: Database instance
+            requested: Dict mapping ticker to the Yahoo symbol to request
+
+        Returns:
+            Dict with counts of updated/failed/skipped tickers
+        """
+        prices, unfetched = self._fetch_batched(list(requested.values()))
+        unfetched = set(unfetched)
+
+        results = {
+            ticker: prices.get(symbol)
+            for ticker, symbol in requested.items() if symbol not in unfetched
+        }
+        db.update_prices_bulk(results)
+
+        updated = sum(1 for price in results.values() if price)
+        return {
+            'updated': updated,
+            'failed': len(results) - updated,
+            'skipped': len(requested) - len(results),
+            'total': len(requested)
+        }
+
     def fetch_historical_for_idea(self, ticker: str, posted_date: datetime) -> Optional[float]:
         """
         Fetch the historical price at recommendation for an idea.
@@ -181,6 +376,9 @@ class YahooFinanceService:
         """
         Fetch and store historical prices for a batch of ideas.
 
+        Daily closes are kept in db too, unless the service was given a
+        database of its own.
+
         Args:
             ideas: List of idea dicts with 'id', 'ticker', 'posted_date'
             db: Database instance
@@ -192,6 +390,10 @@ class YahooFinanceService:
         success = 0
         failed = 0
 
+        if self.db is None:
+            self.db = db
+        self.prefetch_history(ideas)
+
         for i, idea in enumerate(ideas):
             ticker = idea.get('ticker')
             posted_date = idea.get('posted_date')
@@ -201,13 +403,7 @@ class YahooFinanceService:
                 failed += 1
                 continue
 
-            # Parse date if string
-            if isinstance(posted_date, str):
-                try:
-                    posted_date = datetime.fromisoformat(posted_date.replace('Z', '+00:00'))
-                except ValueError:
-                    posted_date = datetime.strptime(posted_date, '%Y-%m-%d')
-
+            posted_date = self._parse_posted_date(posted_date)
             price = self.get_historical_price(ticker, posted_date)
 
             if price:
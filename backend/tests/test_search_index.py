@@ -0,0 +1,49 @@
+"""
+Tests for the in-memory author search index
+"""
+
+from db.search_index import AuthorSearchIndex
+
+
+def _index(*names, xirr=None):
+    xirr = xirr or {}
+    return AuthorSearchIndex([
+        {'id': i, 'username': name, 'xirr5yr': xirr.get(name)} for i, name in enumerate(names)
+    ])
+
+
+def _usernames(results):
+    return [r['username'] for r in results]
+
+
+def test_transposed_username_is_found():
+    index = _index('alice', 'albert', 'malice_capital', 'bob')
+
+    results = index.search('alcie')
+
+    assert _usernames(results)[:1] == ['alice']
+    assert results[0]['match'] == 'fuzzy'
+
+
+def test_transposition_at_start_of_longer_name():
+    index = _index('valueinvestor', 'deepvalue', 'bob')
+
+    results = index.search('avlue')
+
+    assert _usernames(results)[:1] == ['valueinvestor']
+
+
+def test_tiers_rank_prefix_then_substring_then_fuzzy():
+    index = _index('deepvalue', 'value_hunter', 'vaule', 'zzz', xirr={'deepvalue': 0.5})
+
+    results = index.search('value')
+
+    assert [(r['username'], r['match']) for r in results] == [
+        ('value_hunter', 'prefix'), ('deepvalue', 'substring'), ('vaule', 'fuzzy')
+    ]
+
+
+def test_exact_match_ranks_first_among_prefixes():
+    index = _index('alice_smith', 'alice', 'alicia', xirr={'alice_smith': 0.9, 'alicia': 0.8})
+
+    assert _usernames(index.search('alice'))[0] == 'alice'